@@ -0,0 +1,54 @@
+import threading
+from collections import Counter
+from sqlite_database import SQLiteDatabase
+
+
+class CountingSQLiteDatabase(SQLiteDatabase):
+    """SQLiteDatabase that counts statements per public storage method.
+
+    ``calls`` counts method invocations and ``queries`` the statements each
+    one actually ran, so a user-cache hit shows up as a call with no query.
+    """
+
+    counted_methods = (
+        'user_exists_by_phone', 'user_exists_by_telegram_id', 'create_user',
+        'get_login_account', 'bind_telegram_id', 'update_telegram_id', 'get_user_orders_page',
+    )
+
+    def __init__(self, path=None, hasher=None):
+        super().__init__(path, hasher)
+        self.calls = Counter()
+        self.queries = Counter()
+        self._counter_lock = threading.Lock()
+        self._current = threading.local()
+        for name in self.counted_methods:
+            setattr(self, name, self._counted(name, getattr(self, name)))
+
+    def _counted(self, name, method):
+        def wrapper(*args, **kwargs):
+            with self._counter_lock:
+                self.calls[name] += 1
+            self._current.method = name
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._current.method = None
+        return wrapper
+
+    def _count_query(self):
+        method = getattr(self._current, 'method', None) or 'other'
+        with self._counter_lock:
+            self.queries[method] += 1
+
+    def reset_counters(self):
+        with self._counter_lock:
+            self.calls.clear()
+            self.queries.clear()
+
+    def fetch_all(self, query, params=None, dictionary=False):
+        self._count_query()
+        return super().fetch_all(query, params, dictionary)
+
+    def execute(self, query, params=None):
+        self._count_query()
+        return super().execute(query, params)
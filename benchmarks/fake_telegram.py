@@ -0,0 +1,83 @@
+import time
+import asyncio
+from collections import Counter
+from aiohttp import web
+
+BOT_USER = {
+    'id': 1, 'is_bot': True, 'first_name': 'SuperStar Benchmark', 'username': 'superstar_bench_bot',
+    'can_join_groups': False, 'can_read_all_group_messages': False, 'supports_inline_queries': False,
+}
+
+
+class FakeTelegram:
+    """Minimal Bot API server that answers every method and records replies.
+
+    Point the bot at it with TELEGRAM_API_URL. Each sendMessage is stamped
+    on arrival and queued per chat, so a client can wait for the reply to
+    the update it just sent.
+    """
+
+    def __init__(self, host='127.0.0.1', port=18081):
+        self.host = host
+        self.port = port
+        self.url = f"http://{host}:{port}"
+        self.app = web.Application()
+        self.app.router.add_post('/bot{token}/{method}', self._handle)
+        self.runner = None
+        self.requests = Counter()
+        self._replies = {}
+        self._message_id = 0
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def replies(self, chat_id):
+        """Queue of (arrival time, text) for messages sent to ``chat_id``"""
+        queue = self._replies.get(chat_id)
+        if queue is None:
+            queue = self._replies[chat_id] = asyncio.Queue()
+        return queue
+
+    async def _handle(self, request):
+        received = time.perf_counter()
+        method = request.match_info['method']
+        self.requests[method] += 1
+        if request.content_type == 'application/json':
+            data = await request.json()
+        else:
+            data = dict(await request.post())
+
+        if method == 'getMe':
+            return web.json_response({'ok': True, 'result': BOT_USER})
+        if method in ('sendMessage', 'editMessageText'):
+            chat_id = int(data.get('chat_id', 0))
+            self._message_id += 1
+            if method == 'sendMessage':
+                self.replies(chat_id).put_nowait((received, data.get('text', '')))
+            return web.json_response({'ok': True, 'result': {
+                'message_id': self._message_id, 'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'}, 'text': data.get('text', ''),
+            }})
+        if method == 'getUpdates':
+            return web.json_response({'ok': True, 'result': []})
+        return web.json_response({'ok': True, 'result': True})
+
+
+def message_update(update_id, user_id, text):
+    """A private-chat text message update as Telegram would deliver it"""
+    message = {
+        'message_id': update_id, 'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}', 'language_code': 'ar'},
+        'text': text,
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': update_id, 'message': message}
@@ -0,0 +1,230 @@
+"""Drive the real bot with N synthetic users and report per-state latency.
+
+    python benchmarks/load_test.py --users 200 --output bench.json
+
+Every user walks the whole registration conversation (/start through
+CONFIRM_DATA), then a second set of users logs in to pre-seeded accounts.
+Updates go through the production Application (dispatcher,
+ConversationHandler, rate limiter, persistence) and replies come back
+through a fake Bot API server, so a step's latency is the time from
+enqueuing the update until "Telegram" receives the answer. Storage is the
+embedded SQLite backend in a temporary directory, wrapped to count the
+queries each flow sends.
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+import itertools
+import tempfile
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+import bot
+from catalog import REVENUE_RANGES, BUSINESS_TYPES, GOVERNORATES, button, render
+from storage import AsyncDatabase
+from passwords import PasswordHasher
+from benchmarks.fake_telegram import FakeTelegram, message_update
+from benchmarks.counting_db import CountingSQLiteDatabase
+
+PASSWORD = 'bench1234'
+LOCALE = 'ar'
+
+
+def registration_script(i):
+    """(state, text) steps of one new user, and the expected final reply"""
+    steps = [
+        ('START', '/start'),
+        ('REGISTRATION_START', button('register', LOCALE)),
+        ('FULL_NAME', f'Benchmark User {i}'),
+        ('PHONE', f'079{i:08d}'),
+        ('EMAIL', f'user{i}@example.com'),
+        ('BUSINESS_NAME', f'Shop {i}'),
+        ('BUSINESS_ADDRESS', 'Street 1'),
+        ('GOVERNORATE', GOVERNORATES.labels(LOCALE)[i % 18]),
+        ('ANNUAL_REVENUE', REVENUE_RANGES.labels(LOCALE)[i % 5]),
+        ('BUSINESS_TYPE', BUSINESS_TYPES.labels(LOCALE)[i % 2]),
+        ('PASSWORD', PASSWORD),
+        ('CONFIRM_DATA', button('confirm', LOCALE)),
+    ]
+    return steps, render('registration_done', LOCALE)
+
+
+def login_script(i):
+    steps = [
+        ('START', '/start'),
+        ('REGISTRATION_START', button('login', LOCALE)),
+        ('LOGIN_PHONE', f'078{i:08d}'),
+        ('LOGIN_PASSWORD', PASSWORD),
+    ]
+    return steps, render('login_success', LOCALE, name=f'Seeded User {i}')
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(samples):
+    values = sorted(samples)
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2),
+    }
+
+
+class LoadTest:
+    def __init__(self, application, telegram, database, concurrency, timeout):
+        self.application = application
+        self.telegram = telegram
+        self.database = database
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.update_ids = itertools.count(1)
+
+    async def run_flow(self, scripts):
+        """Run every (user_id, steps, expected) script concurrently and summarize"""
+        self.database.reset_counters()
+        latencies = defaultdict(list)
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def user(user_id, steps, expected):
+            async with slots:
+                replies = self.telegram.replies(user_id)
+                text = None
+                for state, message in steps:
+                    update = Update.de_json(message_update(next(self.update_ids), user_id, message), self.application.bot)
+                    sent = time.perf_counter()
+                    await self.application.update_queue.put(update)
+                    try:
+                        received, text = await asyncio.wait_for(replies.get(), self.timeout)
+                    except asyncio.TimeoutError:
+                        return 'timeout'
+                    latencies[state].append(received - sent)
+                return 'ok' if text == expected else 'unexpected_reply'
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(user(*script) for script in scripts))
+        elapsed = time.perf_counter() - started
+
+        updates = sum(len(samples) for samples in latencies.values())
+        queries = dict(self.database.queries)
+        return {
+            'users': len(scripts),
+            'completed': outcomes.count('ok'),
+            'timeouts': outcomes.count('timeout'),
+            'unexpected_replies': outcomes.count('unexpected_reply'),
+            'duration_s': round(elapsed, 3),
+            'users_per_s': round(len(scripts) / elapsed, 2),
+            'updates_per_s': round(updates / elapsed, 2),
+            'db_queries': queries,
+            'db_queries_per_user': round(sum(queries.values()) / max(len(scripts), 1), 2),
+            'db_calls': dict(self.database.calls),
+            'states': {state: summarize(samples) for state, samples in latencies.items()},
+        }
+
+
+def configure_environment(args, telegram, directory):
+    """Settings read by build_application; must be applied before it runs"""
+    os.environ['BOT_TOKEN'] = '123456:benchmark'
+    os.environ['TELEGRAM_API_URL'] = telegram.url
+    os.environ['UPDATE_WORKERS'] = str(args.workers)
+    os.environ['PERSISTENCE_PATH'] = os.path.join(directory, 'state.sqlite3')
+    if not args.telegram_limits:
+        # The fake server has no flood limits; measure the bot, not the pacing
+        os.environ['TELEGRAM_GLOBAL_RATE'] = '1000000'
+        os.environ['TELEGRAM_CHAT_RATE'] = '1000000'
+        os.environ['TELEGRAM_CHAT_BURST'] = '1000000'
+
+
+async def main(args):
+    telegram = FakeTelegram(port=args.port)
+    await telegram.start()
+    directory = tempfile.mkdtemp(prefix='superstar-bench-')
+    configure_environment(args, telegram, directory)
+
+    database = CountingSQLiteDatabase(os.path.join(directory, 'superstar.sqlite3'), PasswordHasher(rounds=args.bcrypt_rounds))
+    database.ensure_schema()
+    bot.db = AsyncDatabase(database, max_workers=args.db_workers)
+    application = bot.build_application()
+
+    # Login flow accounts share one hash so seeding costs a single bcrypt run
+    password_hash = database.hasher.hash(PASSWORD)
+    database.execute_many(
+        "INSERT INTO users (phone, full_name, password_hash) VALUES (%s, %s, %s)",
+        [(f'078{i:08d}', f'Seeded User {i}', password_hash) for i in range(args.users)]
+    )
+
+    load_test = LoadTest(application, telegram, database, args.concurrency or args.users, args.timeout)
+    results = {
+        'config': {
+            'users': args.users, 'concurrency': args.concurrency or args.users, 'workers': args.workers,
+            'db_workers': args.db_workers, 'bcrypt_rounds': args.bcrypt_rounds,
+            'telegram_limits': args.telegram_limits, 'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'flows': {},
+    }
+    try:
+        async with application:
+            await application.start()
+            try:
+                results['flows']['registration'] = await load_test.run_flow(
+                    [(100000 + i, *registration_script(i)) for i in range(args.users)]
+                )
+                results['flows']['login'] = await load_test.run_flow(
+                    [(200000 + i, *login_script(i)) for i in range(args.users)]
+                )
+            finally:
+                await application.stop()
+    finally:
+        await telegram.stop()
+        bot.db.close()
+        database.disconnect()
+        database.hasher.shutdown()
+    results['telegram_requests'] = dict(telegram.requests)
+    return results
+
+
+def print_report(results):
+    for name, flow in results['flows'].items():
+        print(f"\n{name}: {flow['completed']}/{flow['users']} completed in {flow['duration_s']}s "
+              f"({flow['users_per_s']} users/s, {flow['updates_per_s']} updates/s, "
+              f"{flow['db_queries_per_user']} queries/user)")
+        print(f"  {'state':<20}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for state, s in flow['states'].items():
+            print(f"  {state:<20}{s['count']:>7}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test the registration and login conversations")
+    parser.add_argument('--users', type=int, default=100, help="synthetic users per flow")
+    parser.add_argument('--concurrency', type=int, default=0, help="users in flight at once (default: all)")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('UPDATE_WORKERS', '8')), help="dispatcher worker slots")
+    parser.add_argument('--db-workers', type=int, default=4, help="database worker threads (one SQLite connection each)")
+    parser.add_argument('--bcrypt-rounds', type=int, default=int(os.getenv('BCRYPT_ROUNDS', '12')))
+    parser.add_argument('--telegram-limits', action='store_true', help="keep Telegram's real flood limits")
+    parser.add_argument('--timeout', type=float, default=60, help="seconds to wait for each reply")
+    parser.add_argument('--port', type=int, default=18081, help="port of the fake Bot API server")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    # Per-request INFO logs would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(main(args))
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
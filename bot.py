@@ -1,19 +1,40 @@
 import os
+import asyncio
+import signal
 import logging
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, ConversationHandler, CallbackQueryHandler
 from dotenv import load_dotenv
-from database import Database
-import re
+from storage import AsyncDatabase
+from passwords import HasherBusy
+from webserver import WebServer
+from dispatch import PerUserUpdateProcessor
+from persistence import SQLitePersistence
+from notifier import OrderStatusNotifier
+from sweeper import ResetTokenSweeper
+from summary import OrderSummaryRefresher
+from validation import is_valid_phone, is_valid_email, normalize_contact_phone, password_error
+from throttle import LoginThrottle
+from migrations import check_query_plans
+from leader import LeaderElection
+from health import Health
+from ratelimit import PriorityRateLimiter
+from broadcast import Broadcaster
+from logging_setup import configure_logging
+from metrics import (
+    timed_handler, watch_dispatcher, watch_conversations, watch_rate_limiter, watch_user_cache,
+    watch_login_throttle, monitor_event_loop
+)
+from catalog import (
+    Keyboards, LANGUAGE_PICKER, LOCALES, REVENUE_RANGES, BUSINESS_TYPES, GOVERNORATES,
+    ORDER_STATUS_EMOJI, EMAIL_DOMAINS, action, render, inline_button, resolve_locale
+)
+import math
+from datetime import datetime
 
 # Load environment variables
 load_dotenv()
 
-# Enable logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 # Conversation states
@@ -22,12 +43,62 @@ logger = logging.getLogger(__name__)
  PASSWORD, CONFIRM_DATA, LOGIN_PHONE, LOGIN_PASSWORD, 
  RESET_PASSWORD, NEW_PASSWORD) = range(15)
 
-# Initialize database
-db = Database()
+# Conversation state labels for the handler latency metrics
+STATE_NAMES = dict(enumerate((
+    'REGISTRATION_START', 'FULL_NAME', 'PHONE', 'EMAIL', 'BUSINESS_NAME',
+    'BUSINESS_ADDRESS', 'GOVERNORATE', 'ANNUAL_REVENUE', 'BUSINESS_TYPE',
+    'PASSWORD', 'CONFIRM_DATA', 'LOGIN_PHONE', 'LOGIN_PASSWORD',
+    'RESET_PASSWORD', 'NEW_PASSWORD'
+)))
+
+ORDERS_PAGE_SIZE = int(os.getenv('ORDERS_PAGE_SIZE', '5'))
+ORDER_CURSOR_FORMAT = '%Y%m%d%H%M%S%f'
+
+def encode_order_cursor(order):
+    """Pack an order's (created_at, id) keyset position into callback data"""
+    return f"{order['created_at'].strftime(ORDER_CURSOR_FORMAT)}:{order['id']}"
+
+def decode_order_cursor(value):
+    try:
+        created_at, order_id = value.split(':')
+        return datetime.strptime(created_at, ORDER_CURSOR_FORMAT), int(order_id)
+    except ValueError:
+        return None
+
+
+# Telegram IDs allowed to use admin commands such as /broadcast
+ADMIN_IDS = {int(admin_id) for admin_id in os.getenv('ADMIN_IDS', '').split(',') if admin_id.strip()}
+
+# Initialize database (queries run on a worker pool, off the event loop)
+db = AsyncDatabase()
+broadcaster = Broadcaster(db)
+# Decides which replica polls and runs the background jobs
+election = LeaderElection(db)
+# Password attempts per phone and per Telegram account, checked before bcrypt runs
+login_throttle = LoginThrottle()
 
 class SuperStarBot:
     def __init__(self):
         self.web_app_url = os.getenv('WEB_APP_URL', 'http://localhost/superstar')
+        # Every reply keyboard in every language, shared by all requests
+        self.keyboards = Keyboards(self.web_app_url)
+    
+    def locale(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """The language to answer this user in"""
+        user = update.effective_user
+        return resolve_locale(context.user_data, user.language_code if user else None)
+    
+    def reset_user_data(self, context: ContextTypes.DEFAULT_TYPE):
+        """Forget the conversation's data but keep the language choice"""
+        lang = context.user_data.get('lang')
+        context.user_data.clear()
+        if lang:
+            context.user_data['lang'] = lang
+    
+    def restore_language(self, context: ContextTypes.DEFAULT_TYPE, db_user):
+        """Bring back the account's language once user_data has been pruned"""
+        if db_user and db_user['lang'] and 'lang' not in context.user_data:
+            context.user_data['lang'] = db_user['lang']
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
@@ -35,256 +106,196 @@ class SuperStarBot:
         telegram_id = user.id
         
         # Check if user already exists
-        existing_user = db.user_exists_by_telegram_id(telegram_id)
+        existing_user = await db.user_exists_by_telegram_id(telegram_id)
+        self.restore_language(context, existing_user)
+        locale = self.locale(update, context)
         
         if existing_user:
             # User exists, show main menu
-            keyboard = [
-                [KeyboardButton("🌟 افتح تطبيق SuperStar", web_app=WebAppInfo(url=self.web_app_url))],
-                [KeyboardButton("📦 تتبع طلبي"), KeyboardButton("🚪 تسجيل الخروج")]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-            
             await update.message.reply_text(
-                f"مرحباً بك مرة أخرى {existing_user['full_name']}! 👋\n\n"
-                "اختر ما تريد فعله:",
-                reply_markup=reply_markup
+                render('welcome_back', locale, name=existing_user['full_name']),
+                reply_markup=self.keyboards.get('main_menu', locale)
             )
         else:
             # New user, show registration options
-            keyboard = [
-                [KeyboardButton("📝 تسجيل حساب جديد")],
-                [KeyboardButton("🔑 لدي حساب بالفعل")]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-            
             await update.message.reply_text(
-                "🌟 مرحباً بك في SuperStar! 🌟\n\n"
-                "نظام إدارة المخازن والبيع بالجملة المتطور\n"
-                "المتخصص في تجارة الأحذية\n\n"
-                "اختر أحد الخيارات التالية:",
-                reply_markup=reply_markup
+                render('welcome_new', locale),
+                reply_markup=self.keyboards.get('auth', locale)
             )
         
         return REGISTRATION_START
-
+    
     async def registration_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle registration choice"""
-        text = update.message.text
+        choice = action(update.message.text)
+        locale = self.locale(update, context)
         
-        if text == "📝 تسجيل حساب جديد":
+        if choice == 'register':
             await update.message.reply_text(
-                "ممتاز! سنقوم بإنشاء حساب جديد لك.\n\n"
-                "الرجاء إدخال الاسم الثلاثي:",
-                reply_markup=ReplyKeyboardMarkup([["❌ إلغاء"]], resize_keyboard=True)
+                render('ask_full_name', locale),
+                reply_markup=self.keyboards.get('cancel', locale)
             )
             return FULL_NAME
-            
-        elif text == "🔑 لدي حساب بالفعل":
+        
+        elif choice == 'login':
             await update.message.reply_text(
-                "الرجاء إدخال رقم الهاتف المسجل:",
-                reply_markup=ReplyKeyboardMarkup([["❌ إلغاء"]], resize_keyboard=True)
+                render('ask_login_phone', locale),
+                reply_markup=self.keyboards.get('cancel', locale)
             )
             return LOGIN_PHONE
         
         return REGISTRATION_START
-
+    
     async def get_full_name(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get user's full name"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
+        locale = self.locale(update, context)
         full_name = update.message.text.strip()
         if len(full_name) < 6:
-            await update.message.reply_text("الرجاء إدخال الاسم الثلاثي كاملاً (على الأقل 6 أحرف):")
+            await update.message.reply_text(render('full_name_too_short', locale))
             return FULL_NAME
         
         context.user_data['full_name'] = full_name
-        await update.message.reply_text(
-            "ممتاز! 👍\n\n"
-            "الرجاء إدخال رقم الهاتف:\n"
-            "(مثال: 07901234567)"
-        )
+        await update.message.reply_text(render('ask_phone', locale))
         return PHONE
-
+    
     async def get_phone(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get user's phone number"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
+        locale = self.locale(update, context)
         phone = update.message.text.strip()
         
         # Validate phone number (Iraqi format)
-        if not re.match(r'^07[3-9]\d{8}$', phone):
-            await update.message.reply_text(
-                "رقم الهاتف غير صحيح. الرجاء إدخال رقم عراقي صحيح:\n"
-                "(مثال: 07901234567)"
-            )
+        if not is_valid_phone(phone):
+            await update.message.reply_text(render('invalid_phone', locale))
             return PHONE
         
         # Check if phone already exists
-        existing_user = db.user_exists_by_phone(phone)
+        existing_user = await db.user_exists_by_phone(phone)
         if existing_user:
-            await update.message.reply_text(
-                "هذا الرقم مسجل بالفعل في النظام.\n"
-                "يمكنك تسجيل الدخول باستخدام خيار 'لدي حساب بالفعل'"
-            )
+            await update.message.reply_text(render('phone_taken', locale))
             return PHONE
         
         context.user_data['phone'] = phone
         
         # Email input with helper buttons
-        keyboard = [
-            [KeyboardButton("@gmail.com"), KeyboardButton("@yahoo.com")],
-            [KeyboardButton("@hotmail.com"), KeyboardButton("❌ إلغاء")]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-        
         await update.message.reply_text(
-            "الرجاء إدخال البريد الإلكتروني:\n"
-            "(يمكنك استخدام الأزرار أدناه للمساعدة)",
-            reply_markup=reply_markup
+            render('ask_email', locale),
+            reply_markup=self.keyboards.get('email', locale)
         )
         return EMAIL
-
+    
     async def get_email(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get user's email"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
+        locale = self.locale(update, context)
         text = update.message.text.strip()
         
         # Handle helper buttons
-        if text in ["@gmail.com", "@yahoo.com", "@hotmail.com"]:
-            await update.message.reply_text(f"اكتب اسم المستخدم قبل {text}")
+        if text in EMAIL_DOMAINS:
+            await update.message.reply_text(render('email_hint', locale, domain=text))
             return EMAIL
         
         # Validate email
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', text):
-            await update.message.reply_text("البريد الإلكتروني غير صحيح. الرجاء المحاولة مرة أخرى:")
+        if not is_valid_email(text):
+            await update.message.reply_text(render('invalid_email', locale))
             return EMAIL
         
         context.user_data['email'] = text
         await update.message.reply_text(
-            "ما هو اسم نشاطك التجاري أو المنشأة؟",
-            reply_markup=ReplyKeyboardMarkup([["❌ إلغاء"]], resize_keyboard=True)
+            render('ask_business_name', locale),
+            reply_markup=self.keyboards.get('cancel', locale)
         )
         return BUSINESS_NAME
-
+    
     async def get_business_name(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get business name"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
         context.user_data['business_name'] = update.message.text.strip()
-        await update.message.reply_text("أين يقع عنوان المنشأة؟")
+        await update.message.reply_text(render('ask_business_address', self.locale(update, context)))
         return BUSINESS_ADDRESS
-
+    
     async def get_business_address(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get business address"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
+        locale = self.locale(update, context)
         context.user_data['business_address'] = update.message.text.strip()
         
         # Iraqi governorates
-        governorates = [
-            ["بغداد", "البصرة"], ["نينوى", "أربيل"],
-            ["النجف", "كربلاء"], ["الأنبار", "صلاح الدين"],
-            ["كركوك", "ديالى"], ["واسط", "بابل"],
-            ["المثنى", "القادسية"], ["ذي قار", "ميسان"],
-            ["دهوك", "السليمانية"], ["❌ إلغاء"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(governorates, resize_keyboard=True)
-        
         await update.message.reply_text(
-            "الرجاء تحديد محافظة الإقامة:",
-            reply_markup=reply_markup
+            render('ask_governorate', locale),
+            reply_markup=self.keyboards.get('governorates', locale)
         )
         return GOVERNORATE
-
+    
     async def get_governorate(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get governorate"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
-        context.user_data['governorate'] = update.message.text.strip()
+        locale = self.locale(update, context)
+        # Stored under its Arabic name whatever language it was picked in
+        governorate = update.message.text.strip()
+        context.user_data['governorate'] = GOVERNORATES.code(governorate, governorate)
         
         # Annual revenue options
-        revenue_options = [
-            ["أقل من 50 ألف"], ["50-100 ألف"],
-            ["100-200 ألف"], ["200-500 ألف"],
-            ["أكثر من 500 ألف"], ["❌ إلغاء"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(revenue_options, resize_keyboard=True)
-        
         await update.message.reply_text(
-            "كم تقدر أرباحك السنوية؟",
-            reply_markup=reply_markup
+            render('ask_annual_revenue', locale),
+            reply_markup=self.keyboards.get('annual_revenue', locale)
         )
         return ANNUAL_REVENUE
-
+    
     async def get_annual_revenue(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get annual revenue"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
-        revenue_map = {
-            "أقل من 50 ألف": "less_than_50k",
-            "50-100 ألف": "50k_100k",
-            "100-200 ألف": "100k_200k",
-            "200-500 ألف": "200k_500k",
-            "أكثر من 500 ألف": "more_than_500k"
-        }
-        
-        context.user_data['annual_revenue'] = revenue_map.get(update.message.text.strip(), "less_than_50k")
+        locale = self.locale(update, context)
+        context.user_data['annual_revenue'] = REVENUE_RANGES.code(update.message.text.strip(), "less_than_50k")
         
         # Business type options
-        business_types = [
-            ["جملة", "قطاعي"],
-            ["❌ إلغاء"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(business_types, resize_keyboard=True)
-        
         await update.message.reply_text(
-            "ما هو نوع نشاطك؟",
-            reply_markup=reply_markup
+            render('ask_business_type', locale),
+            reply_markup=self.keyboards.get('business_type', locale)
         )
         return BUSINESS_TYPE
-
+    
     async def get_business_type(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get business type"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
-        business_type_map = {
-            "جملة": "wholesale",
-            "قطاعي": "retail"
-        }
-        
-        context.user_data['business_type'] = business_type_map.get(update.message.text.strip(), "retail")
+        locale = self.locale(update, context)
+        context.user_data['business_type'] = BUSINESS_TYPES.code(update.message.text.strip(), "retail")
         
         await update.message.reply_text(
-            "الرجاء إدخال كلمة مرور قوية لتأمين حسابك:\n"
-            "(على الأقل 8 أحرف، تحتوي على أرقام وحروف)",
-            reply_markup=ReplyKeyboardMarkup([["❌ إلغاء"]], resize_keyboard=True)
+            render('ask_password', locale),
+            reply_markup=self.keyboards.get('cancel', locale)
         )
         return PASSWORD
-
+    
     async def get_password(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get password"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
+        locale = self.locale(update, context)
         password = update.message.text.strip()
         
         # Validate password
-        if len(password) < 8:
-            await update.message.reply_text("كلمة المرور يجب أن تكون 8 أحرف على الأقل:")
-            return PASSWORD
-        
-        if not re.search(r'[0-9]', password) or not re.search(r'[a-zA-Z]', password):
-            await update.message.reply_text("كلمة المرور يجب أن تحتوي على أرقام وحروف:")
+        error = password_error(password)
+        if error:
+            await update.message.reply_text(render(error, locale))
             return PASSWORD
         
         context.user_data['password'] = password
@@ -297,102 +308,121 @@ class SuperStarBot:
         
         # Show confirmation
         user_data = context.user_data
-        confirmation_text = f"""
-📋 تأكيد البيانات:
-
-👤 الاسم: {user_data['full_name']}
-📱 الهاتف: {user_data['phone']}
-📧 البريد: {user_data['email']}
-🏢 النشاط: {user_data['business_name']}
-📍 العنوان: {user_data['business_address']}
-🏛️ المحافظة: {user_data['governorate']}
-💰 الأرباح السنوية: {[k for k, v in {"أقل من 50 ألف": "less_than_50k", "50-100 ألف": "50k_100k", "100-200 ألف": "100k_200k", "200-500 ألف": "200k_500k", "أكثر من 500 ألف": "more_than_500k"}.items() if v == user_data['annual_revenue']][0]}
-🏪 نوع النشاط: {"جملة" if user_data['business_type'] == "wholesale" else "قطاعي"}
-
-هل البيانات صحيحة؟
-        """
-        
-        keyboard = [
-            ["✅ تأكيد التسجيل", "❌ إلغاء"],
-            ["✏️ تعديل البيانات"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        confirmation_text = render(
+            'confirm_data', locale,
+            full_name=user_data['full_name'],
+            phone=user_data['phone'],
+            email=user_data['email'],
+            business_name=user_data['business_name'],
+            business_address=user_data['business_address'],
+            governorate=GOVERNORATES.label(user_data['governorate'], locale),
+            annual_revenue=REVENUE_RANGES.label(user_data['annual_revenue'], locale),
+            business_type=BUSINESS_TYPES.label(user_data['business_type'], locale)
+        )
         
-        await update.message.reply_text(confirmation_text, reply_markup=reply_markup)
+        await update.message.reply_text(confirmation_text, reply_markup=self.keyboards.get('confirm', locale))
         return CONFIRM_DATA
-
+    
     async def confirm_data(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Confirm registration data"""
-        text = update.message.text
+        choice = action(update.message.text)
+        locale = self.locale(update, context)
         
-        if text == "✅ تأكيد التسجيل":
+        if choice == 'confirm':
+            if 'password' not in context.user_data:
+                # The password is never persisted, so it is gone after a restart
+                await update.message.reply_text(
+                    render('password_again', locale),
+                    reply_markup=self.keyboards.get('cancel', locale)
+                )
+                return PASSWORD
+            
+            try:
+                # bcrypt runs on the hashing pool, not on a database worker
+                password_hash = await db.hasher.hash_async(context.user_data['password'])
+            except HasherBusy:
+                await update.message.reply_text(render('hasher_busy', locale))
+                return CONFIRM_DATA
+            
             # Save user to database
             user_data = context.user_data.copy()
             user_data['telegram_id'] = update.effective_user.id
+            user_data['password_hash'] = password_hash
+            user_data['lang'] = context.user_data.get('lang')
             
-            user_id = db.create_user(user_data)
+            user_id = await db.create_user(user_data)
             
             if user_id:
                 # Success message with web app button
-                keyboard = [[KeyboardButton("🌟 افتح تطبيق SuperStar", web_app=WebAppInfo(url=self.web_app_url))]]
-                reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-                
                 await update.message.reply_text(
-                    "🎉 تم إنشاء حسابك بنجاح!\n\n"
-                    "مرحباً بك في عائلة SuperStar 🌟\n"
-                    "يمكنك الآن الوصول إلى جميع خدماتنا",
-                    reply_markup=reply_markup
+                    render('registration_done', locale),
+                    reply_markup=self.keyboards.get('registered', locale)
                 )
                 
                 # Clear user data
-                context.user_data.clear()
+                self.reset_user_data(context)
                 return ConversationHandler.END
             else:
-                await update.message.reply_text(
-                    "❌ حدث خطأ أثناء إنشاء الحساب.\n"
-                    "الرجاء المحاولة مرة أخرى أو التواصل مع الدعم الفني."
-                )
+                await update.message.reply_text(render('registration_failed', locale))
                 return CONFIRM_DATA
         
-        elif text == "❌ إلغاء":
+        elif choice == 'cancel':
             return await self.cancel(update, context)
         
-        elif text == "✏️ تعديل البيانات":
-            await update.message.reply_text("سيتم إضافة خاصية التعديل قريباً. الرجاء إلغاء التسجيل والبدء من جديد.")
+        elif choice == 'edit':
+            await update.message.reply_text(render('edit_not_available', locale))
             return CONFIRM_DATA
         
         return CONFIRM_DATA
-
+    
+    async def reply_throttled(self, update: Update, locale, wait):
+        await update.message.reply_text(render('login_throttled', locale, minutes=math.ceil(wait / 60)))
+    
     async def login_phone(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle login phone input"""
-        if update.message.text == "❌ إلغاء":
+        if action(update.message.text) == 'cancel':
             return await self.cancel(update, context)
         
+        locale = self.locale(update, context)
         phone = update.message.text.strip()
         
-        # Check if user exists
-        user = db.user_exists_by_phone(phone)
-        if not user:
-            await update.message.reply_text(
-                "❌ هذا الرقم غير مسجل لدينا.\n"
-                "يمكنك التسجيل من جديد باختيار 'تسجيل حساب جديد'"
-            )
+        # A locked-out account can't keep probing which phones are registered
+        wait = login_throttle.retry_after(('telegram_id', update.effective_user.id))
+        if wait:
+            await self.reply_throttled(update, locale, wait)
+            return LOGIN_PHONE
+        
+        # The account, hash included, is read once here; the password step only writes
+        account = await db.get_login_account(phone)
+        if not account:
+            await update.message.reply_text(render('unknown_phone', locale))
             return LOGIN_PHONE
         
         context.user_data['login_phone'] = phone
-        await update.message.reply_text(
-            "الرجاء إدخال كلمة المرور:\n"
-            "(سيتم حذف رسالتك تلقائياً لحماية خصوصيتك)"
-        )
+        # Never persisted (SENSITIVE_KEYS): after a restart the login starts over
+        context.user_data['login_account'] = account
+        await update.message.reply_text(render('ask_login_password', locale))
         return LOGIN_PASSWORD
-
+    
     async def login_password(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle login password"""
-        if update.message.text == "❌ إلغاء":
+        choice = action(update.message.text)
+        if choice == 'cancel':
             return await self.cancel(update, context)
         
-        password = update.message.text.strip()
-        phone = context.user_data['login_phone']
+        locale = self.locale(update, context)
+        if choice == 'retry':
+            await update.message.reply_text(
+                render('ask_login_password', locale),
+                reply_markup=self.keyboards.get('cancel', locale)
+            )
+            return LOGIN_PASSWORD
+        if choice == 'forgot_password':
+            await update.message.reply_text(
+                render('reset_share_contact', locale),
+                reply_markup=self.keyboards.get('share_contact', locale)
+            )
+            return RESET_PASSWORD
         
         # Delete password message immediately
         try:
@@ -400,148 +430,451 @@ class SuperStarBot:
         except:
             pass
         
-        # Verify password
-        user = db.verify_password(phone, password)
+        phone = context.user_data.get('login_phone')
+        user = context.user_data.get('login_account')
+        if phone is None or user is None:
+            # Restarted since the phone step, which is kept in memory only
+            await update.message.reply_text(render('ask_login_phone', locale))
+            return LOGIN_PHONE
+        
+        password = update.message.text.strip()
+        # Refuse before any query or bcrypt run once either key is over its limit
+        throttle_keys = (('phone', phone), ('telegram_id', update.effective_user.id))
+        wait = login_throttle.hit(*throttle_keys)
+        if wait:
+            await self.reply_throttled(update, locale, wait)
+            return LOGIN_PASSWORD
+        
+        # The password is checked here on the hashing pool, between the read and the bind
+        new_hash = None
+        try:
+            valid = await db.hasher.verify_async(password, user['password_hash'])
+            if valid and user['status'] == 'active' and db.hasher.needs_rehash(user['password_hash']):
+                # Transparently upgrade hashes made with an older cost factor
+                new_hash = await db.hasher.hash_async(password)
+        except HasherBusy:
+            await update.message.reply_text(render('hasher_busy', locale))
+            return LOGIN_PASSWORD
         
-        if user:
+        if valid:
             if user['status'] != 'active':
-                await update.message.reply_text("❌ حسابك معطل. الرجاء التواصل مع الدعم الفني.")
+                await update.message.reply_text(render('account_disabled', locale))
                 return ConversationHandler.END
             
-            # Update telegram ID
-            db.update_telegram_id(phone, update.effective_user.id)
+            # One UPDATE binds the account, upgrades the hash and keeps a language picked before login
+            if not await db.bind_telegram_id(user['id'], update.effective_user.id, new_hash, context.user_data.get('lang')):
+                await update.message.reply_text(render('data_error', locale))
+                return LOGIN_PASSWORD
             
+            login_throttle.clear(*throttle_keys)
+            self.restore_language(context, user)
+            locale = self.locale(update, context)
             # Success - show main menu
-            keyboard = [
-                [KeyboardButton("🌟 افتح تطبيق SuperStar", web_app=WebAppInfo(url=self.web_app_url))],
-                [KeyboardButton("📦 تتبع طلبي"), KeyboardButton("🚪 تسجيل الخروج")]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-            
             await update.message.reply_text(
-                f"مرحباً بك {user['full_name']}! 👋\n\n"
-                "تم تسجيل الدخول بنجاح ✅",
-                reply_markup=reply_markup
+                render('login_success', locale, name=user['full_name']),
+                reply_markup=self.keyboards.get('main_menu', locale)
             )
             
-            context.user_data.clear()
+            self.reset_user_data(context)
             return ConversationHandler.END
         else:
-            keyboard = [
-                [KeyboardButton("🔄 المحاولة مرة أخرى")],
-                [KeyboardButton("🔑 نسيت كلمة المرور؟")],
-                [KeyboardButton("❌ إلغاء")]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-            
             await update.message.reply_text(
-                "❌ كلمة المرور غير صحيحة.\n"
-                "اختر أحد الخيارات:",
-                reply_markup=reply_markup
+                render('wrong_password', locale),
+                reply_markup=self.keyboards.get('login_failed', locale)
             )
             return LOGIN_PASSWORD
-
+    
+    async def reset_contact(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Issue a reset token once the user shares the contact card of the account's phone"""
+        locale = self.locale(update, context)
+        contact = update.message.contact
+        phone = context.user_data.get('login_phone')
+        
+        # Only the user's own contact card proves they hold the number; a
+        # forwarded card of someone else carries a different user_id
+        if contact.user_id != update.effective_user.id or normalize_contact_phone(contact.phone_number) != phone:
+            await update.message.reply_text(render('reset_contact_mismatch', locale))
+            return RESET_PASSWORD
+        
+        user = await db.user_exists_by_phone(phone)
+        token = await db.create_password_reset_token(user['id']) if user else None
+        if not token:
+            self.reset_user_data(context)
+            await update.message.reply_text(
+                render('password_reset_failed', locale),
+                reply_markup=self.keyboards.get('auth', locale)
+            )
+            return ConversationHandler.END
+        
+        # The raw token lives only in memory (never persisted); the table holds its hash
+        context.user_data['reset_token'] = token
+        context.user_data['reset_user_id'] = user['id']
+        await update.message.reply_text(
+            render('ask_new_password', locale),
+            reply_markup=self.keyboards.get('cancel', locale)
+        )
+        return NEW_PASSWORD
+    
+    async def reset_prompt(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Text while waiting for the contact card: cancel, or point at the button"""
+        if action(update.message.text) == 'cancel':
+            return await self.cancel(update, context)
+        
+        locale = self.locale(update, context)
+        await update.message.reply_text(
+            render('reset_use_button', locale),
+            reply_markup=self.keyboards.get('share_contact', locale)
+        )
+        return RESET_PASSWORD
+    
+    async def new_password(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Set the new password and spend the reset token"""
+        if action(update.message.text) == 'cancel':
+            return await self.cancel(update, context)
+        
+        locale = self.locale(update, context)
+        password = update.message.text.strip()
+        
+        try:
+            await update.message.delete()
+        except:
+            pass
+        
+        error = password_error(password)
+        if error:
+            await update.message.reply_text(render(error, locale))
+            return NEW_PASSWORD
+        
+        token = context.user_data.get('reset_token')
+        user_id = context.user_data.get('reset_user_id')
+        try:
+            password_hash = await db.hasher.hash_async(password) if token else None
+        except HasherBusy:
+            await update.message.reply_text(render('hasher_busy', locale))
+            return NEW_PASSWORD
+        # A token lost to a restart fails here like an expired one
+        done = bool(token) and await db.reset_password(user_id, password_hash, token)
+        
+        self.reset_user_data(context)
+        await update.message.reply_text(
+            render('password_reset_done' if done else 'password_reset_failed', locale),
+            reply_markup=self.keyboards.get('auth', locale)
+        )
+        return ConversationHandler.END
+    
     async def handle_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle main menu options"""
-        text = update.message.text
+        choice = action(update.message.text)
         user = update.effective_user
+        locale = self.locale(update, context)
         
-        if text == "📦 تتبع طلبي":
+        if choice == 'track_orders':
             # Get user's recent orders
-            db_user = db.user_exists_by_telegram_id(user.id)
+            db_user = await db.user_exists_by_telegram_id(user.id)
+            page = summary = None
             if db_user:
-                orders = db.get_user_orders(db_user['id'])
-                if orders:
-                    orders_text = "📦 آخر طلباتك:\n\n"
-                    for order in orders:
-                        status_emoji = {
-                            'pending': '⏳',
-                            'confirmed': '✅',
-                            'shipped': '🚚',
-                            'delivered': '📦',
-                            'cancelled': '❌'
-                        }.get(order['status'], '❓')
-                        
-                        orders_text += f"{status_emoji} {order['order_number']}\n"
-                        orders_text += f"المبلغ: {order['total_amount']} د.ع\n"
-                        orders_text += f"التاريخ: {order['created_at'].strftime('%Y-%m-%d')}\n\n"
-                    
-                    await update.message.reply_text(orders_text)
-                else:
-                    await update.message.reply_text("لا توجد طلبات حالياً 📭")
+                page, summary = await asyncio.gather(
+                    db.get_user_orders_page(db_user['id'], ORDERS_PAGE_SIZE),
+                    db.get_order_summary(db_user['id'])
+                )
+            if page is None:
+                await update.message.reply_text(render('data_error', locale))
+            elif page['orders']:
+                orders_text, reply_markup = self.render_orders_page(page, locale)
+                if summary:
+                    orders_text = render(
+                        'order_summary', locale,
+                        open_orders=summary['pending_orders'] + summary['confirmed_orders'],
+                        in_transit=summary['shipped_orders'],
+                        month_amount=summary['month_amount']
+                    ) + orders_text
+                await update.message.reply_text(orders_text, reply_markup=reply_markup)
             else:
-                await update.message.reply_text("❌ خطأ في الوصول للبيانات")
+                await update.message.reply_text(render('no_orders', locale))
         
-        elif text == "🚪 تسجيل الخروج":
+        elif choice == 'logout':
             # Clear telegram_id from database
-            db_user = db.user_exists_by_telegram_id(user.id)
+            db_user = await db.user_exists_by_telegram_id(user.id)
             if db_user:
-                db.update_telegram_id(db_user['phone'], None)
-            
-            keyboard = [
-                [KeyboardButton("📝 تسجيل حساب جديد")],
-                [KeyboardButton("🔑 لدي حساب بالفعل")]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+                await db.update_telegram_id(db_user['phone'], None)
             
             await update.message.reply_text(
-                "تم تسجيل الخروج بنجاح 👋\n"
-                "يمكنك تسجيل الدخول مرة أخرى في أي وقت",
-                reply_markup=reply_markup
+                render('logged_out', locale),
+                reply_markup=self.keyboards.get('auth', locale)
             )
-
+    
+    def render_orders_page(self, page, locale):
+        """Build the text and navigation buttons for one page of orders"""
+        orders = page['orders']
+        orders_text = render('orders_title', locale)
+        for order in orders:
+            orders_text += render(
+                'order_line', locale,
+                emoji=ORDER_STATUS_EMOJI.get(order['status'], '❓'),
+                order_number=order['order_number'],
+                total_amount=order['total_amount'],
+                date=order['created_at'].strftime('%Y-%m-%d')
+            )
+        
+        buttons = []
+        if page['has_newer']:
+            buttons.append(InlineKeyboardButton(inline_button('orders_newer', locale), callback_data=f"orders:newer:{encode_order_cursor(orders[0])}"))
+        if page['has_older']:
+            buttons.append(InlineKeyboardButton(inline_button('orders_older', locale), callback_data=f"orders:older:{encode_order_cursor(orders[-1])}"))
+        return orders_text, InlineKeyboardMarkup([buttons]) if buttons else None
+    
+    async def orders_page(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle next/prev buttons of the order list by editing the message in place"""
+        query = update.callback_query
+        await query.answer()
+        
+        _, direction, cursor = query.data.split(':', 2)
+        cursor = decode_order_cursor(cursor)
+        db_user = await db.user_exists_by_telegram_id(update.effective_user.id)
+        if not db_user or cursor is None:
+            return
+        
+        if direction == 'older':
+            page = await db.get_user_orders_page(db_user['id'], ORDERS_PAGE_SIZE, before=cursor)
+        else:
+            page = await db.get_user_orders_page(db_user['id'], ORDERS_PAGE_SIZE, after=cursor)
+        if not page or not page['orders']:
+            return
+        
+        orders_text, reply_markup = self.render_orders_page(page, self.locale(update, context))
+        await query.edit_message_text(orders_text, reply_markup=reply_markup)
+    
+    async def choose_language(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /language by offering the supported languages"""
+        await update.message.reply_text(
+            render('choose_language', self.locale(update, context)),
+            reply_markup=LANGUAGE_PICKER
+        )
+    
+    async def set_language(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Remember the language picked from the /language buttons"""
+        query = update.callback_query
+        await query.answer()
+        
+        locale = query.data.split(':', 1)[1]
+        if locale not in LOCALES:
+            return
+        context.user_data['lang'] = locale
+        # user_data is pruned after PERSISTENCE_MAX_AGE; the account keeps the choice
+        await db.set_language(update.effective_user.id, locale)
+        await query.edit_message_text(render('language_set', locale))
+    
+    async def broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /broadcast <message> from an admin"""
+        if update.effective_user.id not in ADMIN_IDS:
+            return
+        
+        locale = self.locale(update, context)
+        # Keep the admin's line breaks: take everything after the command itself
+        parts = update.message.text.split(None, 1)
+        message = parts[1].strip() if len(parts) > 1 else ""
+        if not message:
+            await update.message.reply_text(render('broadcast_usage', locale))
+            return
+        
+        # Only the leader sends; elsewhere the broadcast is recorded for it to pick up
+        broadcast_id = await broadcaster.start(
+            context.application, update.effective_user.id, message, locale, launch=election.is_leader
+        )
+        if not broadcast_id:
+            await update.message.reply_text(render('broadcast_failed', locale))
+    
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Cancel conversation"""
-        context.user_data.clear()
-        
-        keyboard = [
-            [KeyboardButton("📝 تسجيل حساب جديد")],
-            [KeyboardButton("🔑 لدي حساب بالفعل")]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        self.reset_user_data(context)
+        locale = self.locale(update, context)
         
         await update.message.reply_text(
-            "تم إلغاء العملية ❌\n"
-            "يمكنك البدء من جديد في أي وقت",
-            reply_markup=reply_markup
+            render('cancelled', locale),
+            reply_markup=self.keyboards.get('auth', locale)
         )
         return ConversationHandler.END
 
-def main():
-    """Start the bot"""
-    # Create application
-    application = Application.builder().token(os.getenv('BOT_TOKEN')).build()
+def build_application():
+    """Create the Application with all SuperStar handlers registered"""
+    builder = Application.builder().token(os.getenv('BOT_TOKEN'))
+    api_url = os.getenv('TELEGRAM_API_URL')
+    if api_url:
+        # Point the bot at another Bot API server (e.g. a local one for testing)
+        builder = builder.base_url(f"{api_url.rstrip('/')}/bot").base_file_url(f"{api_url.rstrip('/')}/file/bot")
+    
+    # Different users are served in parallel; each user's updates stay in order
+    update_processor = PerUserUpdateProcessor(
+        workers=int(os.getenv('UPDATE_WORKERS', '8')),
+        max_pending=int(os.getenv('UPDATE_MAX_PENDING', '0')) or None
+    )
+    builder = builder.concurrent_updates(update_processor)
+    watch_dispatcher(update_processor)
+    # Outgoing requests are paced to Telegram's global and per-chat limits
+    rate_limiter = PriorityRateLimiter()
+    builder = builder.rate_limiter(rate_limiter)
+    watch_rate_limiter(rate_limiter)
+    watch_user_cache(db.database)
+    watch_login_throttle(login_throttle)
+    # Registration/login progress survives restarts (flushed every PERSISTENCE_INTERVAL seconds)
+    builder = builder.persistence(SQLitePersistence())
+    application = builder.build()
+    update_processor.update_queue = application.update_queue
     
     bot = SuperStarBot()
     
+    def text_state(state, callback):
+        # Every handler is timed under its state's name
+        return [MessageHandler(filters.TEXT & ~filters.COMMAND, timed_handler(STATE_NAMES[state], callback))]
+    
     # Conversation handler for registration and login
     conv_handler = ConversationHandler(
-        entry_points=[CommandHandler('start', bot.start)],
+        entry_points=[CommandHandler('start', timed_handler('START', bot.start))],
         states={
-            REGISTRATION_START: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.registration_start)],
-            FULL_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.get_full_name)],
-            PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.get_phone)],
-            EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.get_email)],
-            BUSINESS_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.get_business_name)],
-            BUSINESS_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.get_business_address)],
-            GOVERNORATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.get_governorate)],
-            ANNUAL_REVENUE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.get_annual_revenue)],
-            BUSINESS_TYPE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.get_business_type)],
-            PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.get_password)],
-            CONFIRM_DATA: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.confirm_data)],
-            LOGIN_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.login_phone)],
-            LOGIN_PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.login_password)],
+            REGISTRATION_START: text_state(REGISTRATION_START, bot.registration_start),
+            FULL_NAME: text_state(FULL_NAME, bot.get_full_name),
+            PHONE: text_state(PHONE, bot.get_phone),
+            EMAIL: text_state(EMAIL, bot.get_email),
+            BUSINESS_NAME: text_state(BUSINESS_NAME, bot.get_business_name),
+            BUSINESS_ADDRESS: text_state(BUSINESS_ADDRESS, bot.get_business_address),
+            GOVERNORATE: text_state(GOVERNORATE, bot.get_governorate),
+            ANNUAL_REVENUE: text_state(ANNUAL_REVENUE, bot.get_annual_revenue),
+            BUSINESS_TYPE: text_state(BUSINESS_TYPE, bot.get_business_type),
+            PASSWORD: text_state(PASSWORD, bot.get_password),
+            CONFIRM_DATA: text_state(CONFIRM_DATA, bot.confirm_data),
+            LOGIN_PHONE: text_state(LOGIN_PHONE, bot.login_phone),
+            LOGIN_PASSWORD: text_state(LOGIN_PASSWORD, bot.login_password),
+            RESET_PASSWORD: [
+                MessageHandler(filters.CONTACT, timed_handler(STATE_NAMES[RESET_PASSWORD], bot.reset_contact)),
+            ] + text_state(RESET_PASSWORD, bot.reset_prompt),
+            NEW_PASSWORD: text_state(NEW_PASSWORD, bot.new_password),
         },
-        fallbacks=[CommandHandler('cancel', bot.cancel)]
+        fallbacks=[CommandHandler('cancel', timed_handler('CANCEL', bot.cancel))],
+        name='registration',
+        persistent=True
     )
+    watch_conversations(conv_handler)
     
     # Add handlers
     application.add_handler(conv_handler)
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_main_menu))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, timed_handler('MAIN_MENU', bot.handle_main_menu)))
+    application.add_handler(CallbackQueryHandler(timed_handler('ORDERS_PAGE', bot.orders_page), pattern=r'^orders:'))
+    application.add_handler(CommandHandler('language', timed_handler('LANGUAGE', bot.choose_language)))
+    application.add_handler(CallbackQueryHandler(timed_handler('LANGUAGE', bot.set_language), pattern=r'^lang:'))
+    application.add_handler(CommandHandler('broadcast', timed_handler('BROADCAST', bot.broadcast)))
+    
+    return application
+
+async def run(application):
+    """Serve updates until SIGINT/SIGTERM, by long polling or by webhook (BOT_MODE).
+
+    Every replica serves the webhook (and /metrics). Only the elected leader
+    polls, registers the webhook and runs the background jobs; when it goes
+    away another replica takes over.
+    """
+    mode = os.getenv('BOT_MODE', 'polling')
+    if mode not in ('polling', 'webhook'):
+        raise ValueError(f"Unknown BOT_MODE: {mode}")
+    webhook_path = os.getenv('WEBHOOK_PATH', 'telegram')
+    secret_token = os.getenv('WEBHOOK_SECRET')
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    
+    # Serves /metrics in both modes, and the webhook in webhook mode
+    server = WebServer(application, os.getenv('HTTP_HOST', '0.0.0.0'), int(os.getenv('HTTP_PORT', '8080')))
+    background_tasks = []
+    leader_tasks = []
+    
+    async def lead():
+        """Start everything that must run on exactly one replica"""
+        if float(os.getenv('ORDER_NOTIFY_INTERVAL', '60')) > 0:
+            notifier = OrderStatusNotifier(db)
+            leader_tasks.append(application.create_task(notifier.run(application.bot)))
+        if float(os.getenv('RESET_TOKEN_SWEEP_INTERVAL', '600')) > 0:
+            sweeper = ResetTokenSweeper(db)
+            leader_tasks.append(application.create_task(sweeper.run()))
+        if float(os.getenv('ORDER_SUMMARY_INTERVAL', '30')) > 0:
+            refresher = OrderSummaryRefresher(db)
+            leader_tasks.append(application.create_task(refresher.run()))
+        leader_tasks.append(application.create_task(broadcaster.watch(application)))
+        
+        if mode == 'webhook':
+            webhook_url = os.getenv('WEBHOOK_URL')
+            if webhook_url:
+                await application.bot.set_webhook(
+                    url=f"{webhook_url.rstrip('/')}/{webhook_path.lstrip('/')}",
+                    secret_token=secret_token,
+                    allowed_updates=Update.ALL_TYPES
+                )
+        else:
+            await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+    
+    async def step_down():
+        for task in leader_tasks:
+            task.cancel()
+        leader_tasks.clear()
+        broadcaster.cancel_all()
+        if application.updater.running:
+            await application.updater.stop()
+    
+    # Health probes answer from the start; /readyz stays 503 until warmed up
+    health = Health(db, application.update_processor)
+    server.add_health(health)
+    server.add_metrics(os.getenv('METRICS_PATH', 'metrics'))
+    if mode == 'webhook':
+        if not secret_token:
+            logger.warning("WEBHOOK_SECRET is not set; webhook requests are not authenticated")
+        server.add_webhook(webhook_path, secret_token)
+    await server.start()
+    
+    try:
+        if not await db.ensure_schema():
+            # The handlers would hit missing tables and columns
+            logger.critical("Database migrations failed, not starting")
+            raise RuntimeError("Database migrations failed")
+        # Warn (or refuse to start, QUERY_PLAN_CHECK=fail) if a hot query has lost its index
+        await check_query_plans(db, os.getenv('QUERY_PLAN_CHECK', 'warn'))
+        async with application:
+            await application.start()
+            try:
+                background_tasks.append(application.create_task(monitor_event_loop(on_sample=health.record_loop_lag)))
+                background_tasks.append(application.create_task(login_throttle.run_eviction()))
+                
+                # Warm-up: open the connections and fill the user cache before reporting ready
+                health.warmup = await db.warm_up()
+                logger.info("Warm-up done: %s", health.warmup)
+                await health.check_database()
+                background_tasks.append(application.create_task(health.watch_database()))
+                health.ready = True
+                background_tasks.append(application.create_task(election.run(lead, step_down)))
+                
+                await stop_event.wait()
+            finally:
+                # Stop taking traffic first, so a load balancer drains this replica
+                health.ready = False
+                for task in background_tasks:
+                    task.cancel()
+                await election.resign(step_down)
+                if application.updater.running:
+                    await application.updater.stop()
+                await application.stop()
+    finally:
+        await server.stop()
+    
+    db.close()
+
+def main():
+    """Start the bot"""
+    # Log records are written by a background thread, off the event loop
+    configure_logging()
+    application = build_application()
     
     # Start the bot
-    print("🌟 SuperStar Bot is starting...")
-    application.run_polling()
+    logger.info("🌟 SuperStar Bot is starting...")
+    asyncio.run(run(application))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,132 @@
+import os
+import time
+import asyncio
+import logging
+from telegram.error import TelegramError
+from catalog import DEFAULT_LOCALE, render
+from periodic import run_periodically
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """Sends an admin message to every registered user with a Telegram account.
+
+    Recipients are read chunk by chunk in primary-key order and progress is
+    checkpointed after every chunk, so memory use does not depend on the
+    size of the users table and an interrupted broadcast resumes from its
+    last checkpoint after a restart (the chunk in flight may be sent twice).
+    Messages go out on the rate limiter's bulk lane.
+
+    With several replicas only the leader sends: the others just record the
+    broadcast, and the leader's ``watch`` loop picks it up.
+    """
+
+    def __init__(self, db, chunk_size=None, report_every=None, poll_interval=None):
+        self.db = db
+        self.chunk_size = chunk_size or int(os.getenv('BROADCAST_CHUNK_SIZE', '500'))
+        self.report_every = report_every or int(os.getenv('BROADCAST_REPORT_EVERY', '10'))
+        self.poll_interval = poll_interval or float(os.getenv('BROADCAST_POLL_INTERVAL', '5'))
+        self.tasks = {}
+        # Finished here: a running-broadcasts read from before the end must not restart them
+        self.finished = set()
+
+    async def start(self, application, admin_id, message, locale=DEFAULT_LOCALE, launch=True):
+        broadcast_id = await self.db.create_broadcast(admin_id, message, locale)
+        if not broadcast_id or not launch:
+            return broadcast_id
+        broadcast = {
+            'id': broadcast_id, 'admin_telegram_id': admin_id, 'message': message, 'locale': locale,
+            'last_user_id': 0, 'sent': 0, 'failed': 0
+        }
+        self._launch(application, broadcast)
+        return broadcast_id
+
+    async def resume_pending(self, application):
+        """Pick up broadcasts that were running when the process stopped"""
+        for broadcast in await self.db.get_running_broadcasts() or []:
+            if self._launch(application, broadcast):
+                logger.info("Resuming broadcast %s after user %s", broadcast['id'], broadcast['last_user_id'])
+
+    async def watch(self, application):
+        """Run every pending broadcast, including ones recorded by other replicas, until cancelled"""
+        await run_periodically(lambda: self.resume_pending(application), self.poll_interval, "Broadcast resume check")
+
+    def _launch(self, application, broadcast):
+        """Run ``broadcast`` unless it already is; True if it was started here"""
+        # start() and watch() can both see a new row while its task is being created
+        if broadcast['id'] in self.tasks or broadcast['id'] in self.finished:
+            return False
+        task = application.create_task(self._run(application.bot, broadcast))
+        self.tasks[broadcast['id']] = task
+        task.add_done_callback(lambda _: self.tasks.pop(broadcast['id'], None))
+        return True
+
+    def cancel_all(self):
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+    async def _run(self, bot, broadcast):
+        broadcast_id = broadcast['id']
+        admin_id = broadcast['admin_telegram_id']
+        # Progress goes to the admin in the language they started it in
+        locale = broadcast['locale'] or DEFAULT_LOCALE
+        last_user_id = broadcast['last_user_id']
+        sent, failed = broadcast['sent'], broadcast['failed']
+        started = time.monotonic()
+        start_count = sent + failed
+        chunks = 0
+
+        report = await self._report(bot, admin_id, None, render('broadcast_started', locale, broadcast_id=broadcast_id))
+        while True:
+            recipients = await self.db.get_broadcast_recipients(last_user_id, self.chunk_size)
+            if recipients is None:
+                # Database hiccup: keep the checkpoint and try the same chunk again
+                await asyncio.sleep(5)
+                continue
+            if not recipients:
+                break
+
+            results = await asyncio.gather(*(
+                self._send(bot, telegram_id, broadcast['message']) for _, telegram_id in recipients
+            ))
+            sent += sum(results)
+            failed += len(results) - sum(results)
+            last_user_id = recipients[-1][0]
+            await self.db.checkpoint_broadcast(broadcast_id, last_user_id, sent, failed)
+
+            chunks += 1
+            if chunks % self.report_every == 0:
+                rate = (sent + failed - start_count) / max(time.monotonic() - started, 1e-6)
+                report = await self._report(
+                    bot, admin_id, report,
+                    render('broadcast_progress', locale, broadcast_id=broadcast_id, sent=sent, failed=failed, rate=rate)
+                )
+
+        await self.db.checkpoint_broadcast(broadcast_id, last_user_id, sent, failed, status='done')
+        self.finished.add(broadcast_id)
+        elapsed = time.monotonic() - started
+        rate = (sent + failed - start_count) / max(elapsed, 1e-6)
+        logger.info("Broadcast %s finished: %s sent, %s failed, %.1f msg/s", broadcast_id, sent, failed, rate)
+        await self._report(
+            bot, admin_id, report,
+            render('broadcast_done', locale, broadcast_id=broadcast_id, sent=sent, failed=failed, elapsed=elapsed, rate=rate)
+        )
+
+    async def _send(self, bot, chat_id, message):
+        try:
+            await bot.send_message(chat_id=chat_id, text=message, rate_limit_args={'priority': 'bulk'})
+            return True
+        except TelegramError as e:
+            logger.debug("Broadcast to %s failed: %s", chat_id, e)
+            return False
+
+    async def _report(self, bot, admin_id, report, text):
+        """Send or update the admin's progress message"""
+        try:
+            if report is None:
+                return await bot.send_message(chat_id=admin_id, text=text)
+            return await report.edit_text(text)
+        except TelegramError as e:
+            logger.warning("Could not report broadcast progress: %s", e)
+            return report
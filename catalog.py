@@ -0,0 +1,497 @@
+"""User-facing texts, keyboards and value maps, built once at startup.
+
+Every string a user can see lives here in Arabic, English and Kurdish
+(Sorani). Handlers look texts up by key and locale, reuse the prebuilt
+(immutable) keyboard objects, and turn button labels back into actions or
+stored values through reverse maps that cover all locales, so a label in
+any supported language is understood.
+"""
+from types import MappingProxyType
+from telegram import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
+
+LOCALES = ('ar', 'en', 'ku')
+DEFAULT_LOCALE = 'ar'
+
+# Telegram language_code -> our locale
+LANGUAGE_CODES = MappingProxyType({'ar': 'ar', 'en': 'en', 'ku': 'ku', 'ckb': 'ku'})
+
+LANGUAGE_NAMES = MappingProxyType({'ar': 'العربية', 'en': 'English', 'ku': 'کوردی'})
+
+
+def resolve_locale(user_data, language_code=None):
+    """The user's chosen locale, else their Telegram language, else the default"""
+    locale = user_data.get('lang') if user_data is not None else None
+    if locale in LOCALES:
+        return locale
+    if language_code:
+        return LANGUAGE_CODES.get(language_code.split('-')[0].lower(), DEFAULT_LOCALE)
+    return DEFAULT_LOCALE
+
+
+MESSAGES = {
+    'welcome_back': {
+        'ar': "مرحباً بك مرة أخرى {name}! 👋\n\nاختر ما تريد فعله:",
+        'en': "Welcome back {name}! 👋\n\nWhat would you like to do?",
+        'ku': "بەخێربێیتەوە {name}! 👋\n\nچی دەتەوێت بکەیت؟",
+    },
+    'welcome_new': {
+        'ar': "🌟 مرحباً بك في SuperStar! 🌟\n\n"
+              "نظام إدارة المخازن والبيع بالجملة المتطور\n"
+              "المتخصص في تجارة الأحذية\n\n"
+              "اختر أحد الخيارات التالية:\n\n"
+              "🌐 /language",
+        'en': "🌟 Welcome to SuperStar! 🌟\n\n"
+              "The advanced warehouse and wholesale platform\n"
+              "specialised in the footwear trade\n\n"
+              "Choose one of the options below:\n\n"
+              "🌐 /language",
+        'ku': "🌟 بەخێربێیت بۆ SuperStar! 🌟\n\n"
+              "سیستەمی پێشکەوتووی بەڕێوەبردنی کۆگا و فرۆشتنی کۆمەڵ\n"
+              "تایبەت بە بازرگانی پێڵاو\n\n"
+              "یەکێک لەم هەڵبژاردنانە دیاری بکە:\n\n"
+              "🌐 /language",
+    },
+    'ask_full_name': {
+        'ar': "ممتاز! سنقوم بإنشاء حساب جديد لك.\n\nالرجاء إدخال الاسم الثلاثي:",
+        'en': "Great! Let's create a new account for you.\n\nPlease enter your full name:",
+        'ku': "نایابە! هەژمارێکی نوێت بۆ دروست دەکەین.\n\nتکایە ناوی سیانیت بنووسە:",
+    },
+    'ask_login_phone': {
+        'ar': "الرجاء إدخال رقم الهاتف المسجل:",
+        'en': "Please enter your registered phone number:",
+        'ku': "تکایە ژمارەی مۆبایلی تۆمارکراوت بنووسە:",
+    },
+    'full_name_too_short': {
+        'ar': "الرجاء إدخال الاسم الثلاثي كاملاً (على الأقل 6 أحرف):",
+        'en': "Please enter your full name (at least 6 characters):",
+        'ku': "تکایە ناوی سیانیت بە تەواوی بنووسە (لانیکەم 6 پیت):",
+    },
+    'ask_phone': {
+        'ar': "ممتاز! 👍\n\nالرجاء إدخال رقم الهاتف:\n(مثال: 07901234567)",
+        'en': "Great! 👍\n\nPlease enter your phone number:\n(e.g. 07901234567)",
+        'ku': "نایابە! 👍\n\nتکایە ژمارەی مۆبایلەکەت بنووسە:\n(نموونە: 07901234567)",
+    },
+    'invalid_phone': {
+        'ar': "رقم الهاتف غير صحيح. الرجاء إدخال رقم عراقي صحيح:\n(مثال: 07901234567)",
+        'en': "That phone number is not valid. Please enter a valid Iraqi number:\n(e.g. 07901234567)",
+        'ku': "ژمارەی مۆبایل هەڵەیە. تکایە ژمارەیەکی دروستی عێراقی بنووسە:\n(نموونە: 07901234567)",
+    },
+    'phone_taken': {
+        'ar': "هذا الرقم مسجل بالفعل في النظام.\nيمكنك تسجيل الدخول باستخدام خيار 'لدي حساب بالفعل'",
+        'en': "This number is already registered.\nYou can log in with the 'I already have an account' option",
+        'ku': "ئەم ژمارەیە پێشتر تۆمار کراوە.\nدەتوانیت بە هەڵبژاردنی 'پێشتر هەژمارم هەیە' بچیتە ژوورەوە",
+    },
+    'ask_email': {
+        'ar': "الرجاء إدخال البريد الإلكتروني:\n(يمكنك استخدام الأزرار أدناه للمساعدة)",
+        'en': "Please enter your email address:\n(the buttons below can help)",
+        'ku': "تکایە ئیمەیڵەکەت بنووسە:\n(دەتوانیت دوگمەکانی خوارەوە بەکاربهێنیت)",
+    },
+    'email_hint': {
+        'ar': "اكتب اسم المستخدم قبل {domain}",
+        'en': "Type your user name before {domain}",
+        'ku': "ناوی بەکارهێنەرەکەت پێش {domain} بنووسە",
+    },
+    'invalid_email': {
+        'ar': "البريد الإلكتروني غير صحيح. الرجاء المحاولة مرة أخرى:",
+        'en': "That email address is not valid. Please try again:",
+        'ku': "ئیمەیڵەکە هەڵەیە. تکایە دووبارە هەوڵبدەرەوە:",
+    },
+    'ask_business_name': {
+        'ar': "ما هو اسم نشاطك التجاري أو المنشأة؟",
+        'en': "What is the name of your business?",
+        'ku': "ناوی کار یان دامەزراوەکەت چییە؟",
+    },
+    'ask_business_address': {
+        'ar': "أين يقع عنوان المنشأة؟",
+        'en': "What is the address of your business?",
+        'ku': "ناونیشانی دامەزراوەکەت لە کوێیە؟",
+    },
+    'ask_governorate': {
+        'ar': "الرجاء تحديد محافظة الإقامة:",
+        'en': "Please choose your governorate:",
+        'ku': "تکایە پارێزگاکەت دیاری بکە:",
+    },
+    'ask_annual_revenue': {
+        'ar': "كم تقدر أرباحك السنوية؟",
+        'en': "What is your estimated annual revenue?",
+        'ku': "قازانجی ساڵانەت بە نزیکەیی چەندە؟",
+    },
+    'ask_business_type': {
+        'ar': "ما هو نوع نشاطك؟",
+        'en': "What type of business do you run?",
+        'ku': "جۆری کارەکەت چییە؟",
+    },
+    'ask_password': {
+        'ar': "الرجاء إدخال كلمة مرور قوية لتأمين حسابك:\n(على الأقل 8 أحرف، تحتوي على أرقام وحروف)",
+        'en': "Please choose a strong password for your account:\n(at least 8 characters, with letters and digits)",
+        'ku': "تکایە وشەیەکی نهێنی بەهێز بۆ پاراستنی هەژمارەکەت بنووسە:\n(لانیکەم 8 پیت، پیت و ژمارە لەخۆبگرێت)",
+    },
+    'password_too_short': {
+        'ar': "كلمة المرور يجب أن تكون 8 أحرف على الأقل:",
+        'en': "The password must be at least 8 characters long:",
+        'ku': "وشەی نهێنی دەبێت لانیکەم 8 پیت بێت:",
+    },
+    'password_needs_mix': {
+        'ar': "كلمة المرور يجب أن تحتوي على أرقام وحروف:",
+        'en': "The password must contain both letters and digits:",
+        'ku': "وشەی نهێنی دەبێت پیت و ژمارە لەخۆبگرێت:",
+    },
+    'confirm_data': {
+        'ar': "\n📋 تأكيد البيانات:\n\n"
+              "👤 الاسم: {full_name}\n"
+              "📱 الهاتف: {phone}\n"
+              "📧 البريد: {email}\n"
+              "🏢 النشاط: {business_name}\n"
+              "📍 العنوان: {business_address}\n"
+              "🏛️ المحافظة: {governorate}\n"
+              "💰 الأرباح السنوية: {annual_revenue}\n"
+              "🏪 نوع النشاط: {business_type}\n\n"
+              "هل البيانات صحيحة؟",
+        'en': "\n📋 Please confirm your details:\n\n"
+              "👤 Name: {full_name}\n"
+              "📱 Phone: {phone}\n"
+              "📧 Email: {email}\n"
+              "🏢 Business: {business_name}\n"
+              "📍 Address: {business_address}\n"
+              "🏛️ Governorate: {governorate}\n"
+              "💰 Annual revenue: {annual_revenue}\n"
+              "🏪 Business type: {business_type}\n\n"
+              "Is everything correct?",
+        'ku': "\n📋 پشتڕاستکردنەوەی زانیارییەکان:\n\n"
+              "👤 ناو: {full_name}\n"
+              "📱 مۆبایل: {phone}\n"
+              "📧 ئیمەیڵ: {email}\n"
+              "🏢 کار: {business_name}\n"
+              "📍 ناونیشان: {business_address}\n"
+              "🏛️ پارێزگا: {governorate}\n"
+              "💰 قازانجی ساڵانە: {annual_revenue}\n"
+              "🏪 جۆری کار: {business_type}\n\n"
+              "ئایا زانیارییەکان دروستن؟",
+    },
+    'password_again': {
+        'ar': "الرجاء إدخال كلمة المرور مرة أخرى لإكمال التسجيل:",
+        'en': "Please enter your password again to finish registering:",
+        'ku': "تکایە وشەی نهێنی دووبارە بنووسەوە بۆ تەواوکردنی تۆمارکردن:",
+    },
+    'registration_done': {
+        'ar': "🎉 تم إنشاء حسابك بنجاح!\n\nمرحباً بك في عائلة SuperStar 🌟\nيمكنك الآن الوصول إلى جميع خدماتنا",
+        'en': "🎉 Your account has been created!\n\nWelcome to the SuperStar family 🌟\nAll our services are now available to you",
+        'ku': "🎉 هەژمارەکەت بە سەرکەوتوویی دروستکرا!\n\nبەخێربێیت بۆ خێزانی SuperStar 🌟\nئێستا دەتوانیت هەموو خزمەتگوزارییەکانمان بەکاربهێنیت",
+    },
+    'registration_failed': {
+        'ar': "❌ حدث خطأ أثناء إنشاء الحساب.\nالرجاء المحاولة مرة أخرى أو التواصل مع الدعم الفني.",
+        'en': "❌ Something went wrong while creating your account.\nPlease try again or contact support.",
+        'ku': "❌ هەڵەیەک ڕوویدا لە کاتی دروستکردنی هەژمار.\nتکایە دووبارە هەوڵبدەرەوە یان پەیوەندی بە پشتیوانییەوە بکە.",
+    },
+    'edit_not_available': {
+        'ar': "سيتم إضافة خاصية التعديل قريباً. الرجاء إلغاء التسجيل والبدء من جديد.",
+        'en': "Editing is coming soon. Please cancel and start again.",
+        'ku': "تایبەتمەندی دەستکاریکردن بەم زووانە زیاد دەکرێت. تکایە هەڵیبوەشێنەوە و لە سەرەتاوە دەست پێبکەرەوە.",
+    },
+    'unknown_phone': {
+        'ar': "❌ هذا الرقم غير مسجل لدينا.\nيمكنك التسجيل من جديد باختيار 'تسجيل حساب جديد'",
+        'en': "❌ This number is not registered with us.\nYou can sign up with 'Create a new account'",
+        'ku': "❌ ئەم ژمارەیە لای ئێمە تۆمار نەکراوە.\nدەتوانیت بە هەڵبژاردنی 'دروستکردنی هەژماری نوێ' خۆت تۆمار بکەیت",
+    },
+    'ask_login_password': {
+        'ar': "الرجاء إدخال كلمة المرور:\n(سيتم حذف رسالتك تلقائياً لحماية خصوصيتك)",
+        'en': "Please enter your password:\n(your message will be deleted automatically to protect your privacy)",
+        'ku': "تکایە وشەی نهێنی بنووسە:\n(نامەکەت خۆکارانە دەسڕدرێتەوە بۆ پاراستنی تایبەتێتیت)",
+    },
+    'hasher_busy': {
+        'ar': "⏳ الخدمة مشغولة حالياً، الرجاء إعادة إرسال كلمة المرور بعد لحظات.",
+        'en': "⏳ We are busy right now, please send your password again in a moment.",
+        'ku': "⏳ خزمەتگوزارییەکە ئێستا قەرەباڵغە، تکایە دوای چەند ساتێک وشەی نهێنی دووبارە بنێرەوە.",
+    },
+    'login_throttled': {
+        'ar': "⛔ محاولات كثيرة لتسجيل الدخول. الرجاء المحاولة بعد {minutes} دقيقة.",
+        'en': "⛔ Too many login attempts. Please try again in {minutes} min.",
+        'ku': "⛔ هەوڵی زۆر بۆ چوونەژوورەوە. تکایە دوای {minutes} خولەک هەوڵبدەرەوە.",
+    },
+    'account_disabled': {
+        'ar': "❌ حسابك معطل. الرجاء التواصل مع الدعم الفني.",
+        'en': "❌ Your account is disabled. Please contact support.",
+        'ku': "❌ هەژمارەکەت ناچالاک کراوە. تکایە پەیوەندی بە پشتیوانییەوە بکە.",
+    },
+    'login_success': {
+        'ar': "مرحباً بك {name}! 👋\n\nتم تسجيل الدخول بنجاح ✅",
+        'en': "Welcome {name}! 👋\n\nYou are now logged in ✅",
+        'ku': "بەخێربێیت {name}! 👋\n\nبە سەرکەوتوویی چوویتە ژوورەوە ✅",
+    },
+    'wrong_password': {
+        'ar': "❌ كلمة المرور غير صحيحة.\nاختر أحد الخيارات:",
+        'en': "❌ Wrong password.\nChoose an option:",
+        'ku': "❌ وشەی نهێنی هەڵەیە.\nیەکێک لە هەڵبژاردنەکان دیاری بکە:",
+    },
+    'data_error': {
+        'ar': "❌ خطأ في الوصول للبيانات",
+        'en': "❌ Could not load your data",
+        'ku': "❌ هەڵە لە گەیشتن بە زانیارییەکان",
+    },
+    'orders_title': {
+        'ar': "📦 طلباتك:\n\n",
+        'en': "📦 Your orders:\n\n",
+        'ku': "📦 داواکارییەکانت:\n\n",
+    },
+    'order_line': {
+        'ar': "{emoji} {order_number}\nالمبلغ: {total_amount} د.ع\nالتاريخ: {date}\n\n",
+        'en': "{emoji} {order_number}\nAmount: {total_amount} IQD\nDate: {date}\n\n",
+        'ku': "{emoji} {order_number}\nبڕ: {total_amount} د.ع\nبەروار: {date}\n\n",
+    },
+    'order_summary': {
+        'ar': "📊 طلبات مفتوحة: {open_orders} | قيد الشحن: {in_transit}\n💰 مشترياتك هذا الشهر: {month_amount} د.ع\n\n",
+        'en': "📊 Open orders: {open_orders} | In transit: {in_transit}\n💰 Spent this month: {month_amount} IQD\n\n",
+        'ku': "📊 داواکاریی کراوە: {open_orders} | لە ڕێگادا: {in_transit}\n💰 خەرجی ئەم مانگە: {month_amount} د.ع\n\n",
+    },
+    'no_orders': {
+        'ar': "لا توجد طلبات حالياً 📭",
+        'en': "You have no orders yet 📭",
+        'ku': "هیچ داواکارییەک نییە 📭",
+    },
+    'logged_out': {
+        'ar': "تم تسجيل الخروج بنجاح 👋\nيمكنك تسجيل الدخول مرة أخرى في أي وقت",
+        'en': "You have been logged out 👋\nYou can log in again at any time",
+        'ku': "بە سەرکەوتوویی چوویتە دەرەوە 👋\nهەر کاتێک بتەوێت دەتوانیت دووبارە بچیتە ژوورەوە",
+    },
+    'cancelled': {
+        'ar': "تم إلغاء العملية ❌\nيمكنك البدء من جديد في أي وقت",
+        'en': "Cancelled ❌\nYou can start again at any time",
+        'ku': "کردارەکە هەڵوەشێنرایەوە ❌\nهەر کاتێک بتەوێت دەتوانیت لە سەرەتاوە دەست پێبکەیتەوە",
+    },
+    'broadcast_usage': {
+        'ar': "الاستخدام: /broadcast نص الرسالة",
+        'en': "Usage: /broadcast message text",
+        'ku': "بەکارهێنان: /broadcast دەقی نامە",
+    },
+    'broadcast_failed': {
+        'ar': "❌ تعذر بدء البث. الرجاء المحاولة لاحقاً.",
+        'en': "❌ Could not start the broadcast. Please try again later.",
+        'ku': "❌ نەتوانرا پەخشەکە دەست پێبکات. تکایە دواتر هەوڵبدەرەوە.",
+    },
+    'broadcast_started': {
+        'ar': "📣 بدأ البث #{broadcast_id}...",
+        'en': "📣 Broadcast #{broadcast_id} started...",
+        'ku': "📣 پەخشی #{broadcast_id} دەستی پێکرد...",
+    },
+    'broadcast_progress': {
+        'ar': "📣 البث #{broadcast_id} جارٍ...\n✅ {sent}  ❌ {failed}\n⚡ {rate:.1f} رسالة/ثانية",
+        'en': "📣 Broadcast #{broadcast_id} in progress...\n✅ {sent}  ❌ {failed}\n⚡ {rate:.1f} messages/s",
+        'ku': "📣 پەخشی #{broadcast_id} بەردەوامە...\n✅ {sent}  ❌ {failed}\n⚡ {rate:.1f} نامە/چرکە",
+    },
+    'broadcast_done': {
+        'ar': "✅ انتهى البث #{broadcast_id}\n✅ {sent}  ❌ {failed}\n⏱️ {elapsed:.0f} ثانية ({rate:.1f} رسالة/ثانية)",
+        'en': "✅ Broadcast #{broadcast_id} finished\n✅ {sent}  ❌ {failed}\n⏱️ {elapsed:.0f} s ({rate:.1f} messages/s)",
+        'ku': "✅ پەخشی #{broadcast_id} تەواو بوو\n✅ {sent}  ❌ {failed}\n⏱️ {elapsed:.0f} چرکە ({rate:.1f} نامە/چرکە)",
+    },
+    'choose_language': {
+        'ar': "🌐 اختر اللغة:",
+        'en': "🌐 Choose your language:",
+        'ku': "🌐 زمانەکەت هەڵبژێرە:",
+    },
+    'language_set': {
+        'ar': "✅ تم اختيار اللغة العربية",
+        'en': "✅ Language set to English",
+        'ku': "✅ زمانی کوردی هەڵبژێردرا",
+    },
+    'reset_share_contact': {
+        'ar': "🔑 لاستعادة كلمة المرور، شارك رقم هاتفك المسجل باستخدام الزر أدناه.",
+        'en': "🔑 To reset your password, share your registered phone number with the button below.",
+        'ku': "🔑 بۆ گەڕاندنەوەی وشەی نهێنی، ژمارەی مۆبایلە تۆمارکراوەکەت بە دوگمەی خوارەوە بنێرە.",
+    },
+    'reset_use_button': {
+        'ar': "الرجاء استخدام زر مشاركة رقم الهاتف أدناه.",
+        'en': "Please use the share phone number button below.",
+        'ku': "تکایە دوگمەی ناردنی ژمارەی مۆبایل لە خوارەوە بەکاربهێنە.",
+    },
+    'reset_contact_mismatch': {
+        'ar': "❌ الرقم المشارك لا يطابق رقم الحساب. الرجاء مشاركة رقمك أنت.",
+        'en': "❌ The shared number does not match the account. Please share your own number.",
+        'ku': "❌ ژمارە نێردراوەکە لەگەڵ هەژمارەکە ناگونجێت. تکایە ژمارەی خۆت بنێرە.",
+    },
+    'ask_new_password': {
+        'ar': "✅ تم التحقق من رقمك.\nالرجاء إدخال كلمة المرور الجديدة (8 أحرف على الأقل، تحتوي على أرقام وحروف):",
+        'en': "✅ Your number is verified.\nPlease enter a new password (at least 8 characters, with letters and numbers):",
+        'ku': "✅ ژمارەکەت پشتڕاستکرایەوە.\nتکایە وشەی نهێنی نوێ بنووسە (لانیکەم 8 پیت، بە پیت و ژمارەوە):",
+    },
+    'password_reset_done': {
+        'ar': "✅ تم تغيير كلمة المرور بنجاح. يمكنك تسجيل الدخول الآن.",
+        'en': "✅ Your password has been changed. You can log in now.",
+        'ku': "✅ وشەی نهێنی بە سەرکەوتوویی گۆڕدرا. ئێستا دەتوانیت بچیتە ژوورەوە.",
+    },
+    'password_reset_failed': {
+        'ar': "❌ انتهت صلاحية طلب الاستعادة أو حدث خطأ. الرجاء المحاولة من جديد.",
+        'en': "❌ The reset request expired or something went wrong. Please start again.",
+        'ku': "❌ داواکاری گەڕاندنەوە بەسەرچوو یان هەڵەیەک ڕوویدا. تکایە لە سەرەتاوە هەوڵبدەرەوە.",
+    },
+    'order_status_update': {
+        'ar': "🔔 تحديث على طلبك\n\n{emoji} {order_number}\nالحالة: {status}",
+        'en': "🔔 Your order was updated\n\n{emoji} {order_number}\nStatus: {status}",
+        'ku': "🔔 نوێکردنەوەی داواکارییەکەت\n\n{emoji} {order_number}\nدۆخ: {status}",
+    },
+}
+
+for _key, _templates in MESSAGES.items():
+    assert set(_templates) == set(LOCALES), f"message {_key!r} is missing a locale"
+MESSAGES = MappingProxyType({key: MappingProxyType(templates) for key, templates in MESSAGES.items()})
+
+
+def render(key, locale, **kwargs):
+    """Render message ``key`` in ``locale``"""
+    template = MESSAGES[key][locale]
+    return template.format(**kwargs) if kwargs else template
+
+
+class ValueMap:
+    """Bidirectional map between stored codes and their labels in every locale"""
+
+    def __init__(self, labels):
+        self._labels = MappingProxyType({code: MappingProxyType(by_locale) for code, by_locale in labels.items()})
+        self._codes = MappingProxyType({
+            label: code for code, by_locale in labels.items() for label in by_locale.values()
+        })
+
+    def label(self, code, locale):
+        """Label of ``code`` in ``locale``; unknown codes are shown as-is"""
+        by_locale = self._labels.get(code)
+        return by_locale[locale] if by_locale else code
+
+    def code(self, label, default=None):
+        """Code for a label written in any locale"""
+        return self._codes.get(label, default)
+
+    def labels(self, locale):
+        return [by_locale[locale] for by_locale in self._labels.values()]
+
+    def __iter__(self):
+        return iter(self._labels)
+
+
+REVENUE_RANGES = ValueMap({
+    'less_than_50k': {'ar': "أقل من 50 ألف", 'en': "Less than 50K", 'ku': "کەمتر لە 50 هەزار"},
+    '50k_100k': {'ar': "50-100 ألف", 'en': "50K-100K", 'ku': "50-100 هەزار"},
+    '100k_200k': {'ar': "100-200 ألف", 'en': "100K-200K", 'ku': "100-200 هەزار"},
+    '200k_500k': {'ar': "200-500 ألف", 'en': "200K-500K", 'ku': "200-500 هەزار"},
+    'more_than_500k': {'ar': "أكثر من 500 ألف", 'en': "More than 500K", 'ku': "زیاتر لە 500 هەزار"},
+})
+
+BUSINESS_TYPES = ValueMap({
+    'wholesale': {'ar': "جملة", 'en': "Wholesale", 'ku': "کۆمەڵ"},
+    'retail': {'ar': "قطاعي", 'en': "Retail", 'ku': "تاک"},
+})
+
+# Governorates are stored under their Arabic name, as before
+GOVERNORATES = ValueMap({
+    "بغداد": {'ar': "بغداد", 'en': "Baghdad", 'ku': "بەغدا"},
+    "البصرة": {'ar': "البصرة", 'en': "Basra", 'ku': "بەسرە"},
+    "نينوى": {'ar': "نينوى", 'en': "Nineveh", 'ku': "نەینەوا"},
+    "أربيل": {'ar': "أربيل", 'en': "Erbil", 'ku': "هەولێر"},
+    "النجف": {'ar': "النجف", 'en': "Najaf", 'ku': "نەجەف"},
+    "كربلاء": {'ar': "كربلاء", 'en': "Karbala", 'ku': "کەربەلا"},
+    "الأنبار": {'ar': "الأنبار", 'en': "Anbar", 'ku': "ئەنبار"},
+    "صلاح الدين": {'ar': "صلاح الدين", 'en': "Saladin", 'ku': "سەڵاحەدین"},
+    "كركوك": {'ar': "كركوك", 'en': "Kirkuk", 'ku': "کەرکووک"},
+    "ديالى": {'ar': "ديالى", 'en': "Diyala", 'ku': "دیالە"},
+    "واسط": {'ar': "واسط", 'en': "Wasit", 'ku': "واست"},
+    "بابل": {'ar': "بابل", 'en': "Babylon", 'ku': "بابل"},
+    "المثنى": {'ar': "المثنى", 'en': "Muthanna", 'ku': "موسەننا"},
+    "القادسية": {'ar': "القادسية", 'en': "Qadisiyyah", 'ku': "قادسیە"},
+    "ذي قار": {'ar': "ذي قار", 'en': "Dhi Qar", 'ku': "زیقار"},
+    "ميسان": {'ar': "ميسان", 'en': "Maysan", 'ku': "مەیسان"},
+    "دهوك": {'ar': "دهوك", 'en': "Duhok", 'ku': "دهۆک"},
+    "السليمانية": {'ar': "السليمانية", 'en': "Sulaymaniyah", 'ku': "سلێمانی"},
+})
+
+ORDER_STATUSES = ValueMap({
+    'pending': {'ar': "قيد المراجعة", 'en': "Pending", 'ku': "چاوەڕوان"},
+    'confirmed': {'ar': "تم التأكيد", 'en': "Confirmed", 'ku': "پشتڕاستکرایەوە"},
+    'shipped': {'ar': "تم الشحن", 'en': "Shipped", 'ku': "نێردرا"},
+    'delivered': {'ar': "تم التوصيل", 'en': "Delivered", 'ku': "گەیەندرا"},
+    'cancelled': {'ar': "ملغي", 'en': "Cancelled", 'ku': "هەڵوەشێنرایەوە"},
+})
+
+ORDER_STATUS_EMOJI = MappingProxyType({
+    'pending': '⏳',
+    'confirmed': '✅',
+    'shipped': '🚚',
+    'delivered': '📦',
+    'cancelled': '❌'
+})
+
+EMAIL_DOMAINS = ("@gmail.com", "@yahoo.com", "@hotmail.com")
+
+# Reply-keyboard buttons, keyed by the action they trigger
+BUTTONS = {
+    'open_app': {'ar': "🌟 افتح تطبيق SuperStar", 'en': "🌟 Open the SuperStar app", 'ku': "🌟 ئەپی SuperStar بکەرەوە"},
+    'track_orders': {'ar': "📦 تتبع طلبي", 'en': "📦 Track my orders", 'ku': "📦 بەدواداچوونی داواکارییەکانم"},
+    'logout': {'ar': "🚪 تسجيل الخروج", 'en': "🚪 Log out", 'ku': "🚪 چوونەدەرەوە"},
+    'register': {'ar': "📝 تسجيل حساب جديد", 'en': "📝 Create a new account", 'ku': "📝 دروستکردنی هەژماری نوێ"},
+    'login': {'ar': "🔑 لدي حساب بالفعل", 'en': "🔑 I already have an account", 'ku': "🔑 پێشتر هەژمارم هەیە"},
+    'cancel': {'ar': "❌ إلغاء", 'en': "❌ Cancel", 'ku': "❌ هەڵوەشاندنەوە"},
+    'confirm': {'ar': "✅ تأكيد التسجيل", 'en': "✅ Confirm registration", 'ku': "✅ پشتڕاستکردنەوەی تۆمارکردن"},
+    'edit': {'ar': "✏️ تعديل البيانات", 'en': "✏️ Edit my details", 'ku': "✏️ دەستکاریکردنی زانیارییەکان"},
+    'retry': {'ar': "🔄 المحاولة مرة أخرى", 'en': "🔄 Try again", 'ku': "🔄 دووبارە هەوڵبدەرەوە"},
+    'forgot_password': {'ar': "🔑 نسيت كلمة المرور؟", 'en': "🔑 Forgot your password?", 'ku': "🔑 وشەی نهێنیت لەبیر چووە؟"},
+    'share_contact': {'ar': "📱 مشاركة رقم الهاتف", 'en': "📱 Share my phone number", 'ku': "📱 ناردنی ژمارەی مۆبایل"},
+}
+
+# Inline-button labels
+INLINE_BUTTONS = {
+    'orders_newer': {'ar': "⬅️ الأحدث", 'en': "⬅️ Newer", 'ku': "⬅️ نوێتر"},
+    'orders_older': {'ar': "الأقدم ➡️", 'en': "Older ➡️", 'ku': "کۆنتر ➡️"},
+}
+
+_ACTIONS = MappingProxyType({label: action for action, by_locale in BUTTONS.items() for label in by_locale.values()})
+
+
+def action(label):
+    """The action behind a reply-keyboard label in any locale, or None"""
+    return _ACTIONS.get(label)
+
+
+def button(action_name, locale):
+    return BUTTONS[action_name][locale]
+
+
+def inline_button(name, locale):
+    return INLINE_BUTTONS[name][locale]
+
+
+LANGUAGE_PICKER = InlineKeyboardMarkup([[
+    InlineKeyboardButton(LANGUAGE_NAMES[locale], callback_data=f"lang:{locale}") for locale in LOCALES
+]])
+
+
+def _pairs(labels):
+    return [labels[i:i + 2] for i in range(0, len(labels), 2)]
+
+
+class Keyboards:
+    """Every reply keyboard in every locale, built once.
+
+    Telegram objects are immutable, so the same markup instance is safely
+    shared by all users and requests.
+    """
+
+    def __init__(self, web_app_url):
+        self._markups = {}
+        for locale in LOCALES:
+            b = {name: labels[locale] for name, labels in BUTTONS.items()}
+            open_app = KeyboardButton(b['open_app'], web_app=WebAppInfo(url=web_app_url))
+            layouts = {
+                'main_menu': [[open_app], [KeyboardButton(b['track_orders']), KeyboardButton(b['logout'])]],
+                'registered': [[open_app]],
+                'auth': [[b['register']], [b['login']]],
+                'cancel': [[b['cancel']]],
+                'email': [[EMAIL_DOMAINS[0], EMAIL_DOMAINS[1]], [EMAIL_DOMAINS[2], b['cancel']]],
+                'governorates': _pairs(GOVERNORATES.labels(locale)) + [[b['cancel']]],
+                'annual_revenue': [[label] for label in REVENUE_RANGES.labels(locale)] + [[b['cancel']]],
+                'business_type': [BUSINESS_TYPES.labels(locale), [b['cancel']]],
+                'confirm': [[b['confirm'], b['cancel']], [b['edit']]],
+                'login_failed': [[b['retry']], [b['forgot_password']], [b['cancel']]],
+                'share_contact': [[KeyboardButton(b['share_contact'], request_contact=True)], [b['cancel']]],
+            }
+            for name, rows in layouts.items():
+                self._markups[(name, locale)] = ReplyKeyboardMarkup(rows, resize_keyboard=True)
+
+    def get(self, name, locale):
+        return self._markups[(name, locale)]
@@ -1,164 +1,536 @@
 import mysql.connector
 from mysql.connector import Error
 import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
-import bcrypt
-from datetime import datetime, timedelta
-import secrets
+from storage import Storage, ExecResult
+from migrations import Migration, Column, LOOKUP_INDEXES
 
 load_dotenv()
 
-class Database:
-    def __init__(self):
+logger = logging.getLogger(__name__)
+
+class PoolTimeout(Error):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of MySQL connections.
+
+    Connections are handed out most-recently-used first so the warm ones stay
+    in use and the rest can age out. A connection is only pinged when it has
+    been idle for longer than ``validate_after`` seconds, and connections idle
+    for longer than ``recycle`` seconds are closed (down to ``min_size``).
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0, recycle=1800, validate_after=30):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.validate_after = validate_after
+        self._idle = deque()  # (connection, last_used), most recent on the right
+        self._cond = threading.Condition()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._created = 0
+        self._recycled = 0
+        self._timeouts = 0
+
+    def fill(self, target=None):
+        """Open connections until the pool holds at least ``target`` (default min_size)"""
+        target = self.min_size if target is None else min(target, self.max_size)
+        while True:
+            with self._cond:
+                if self._size >= target:
+                    return
+                self._size += 1
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def checkout(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(msg=f"no database connection available after {self.timeout}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            stale = self._take_stale()
+
+        self._close_all(stale)
+        try:
+            if conn is None:
+                return self._new_connection()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.recycle:
+                self._close(conn)
+                self._recycled += 1
+                return self._new_connection()
+            if idle_for > self.validate_after and not conn.is_connected():
+                self._close(conn)
+                return self._new_connection()
+            return conn
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def checkin(self, conn, discard=False):
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except Error:
+                discard = True
+        if discard:
+            self._close(conn)
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the with-block"""
+        conn = self.checkout()
+        try:
+            yield conn
+        except (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError):
+            self.checkin(conn, discard=True)
+            raise
+        except BaseException:
+            self.checkin(conn)
+            raise
+        else:
+            self.checkin(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'created': self._created,
+                'recycled': self._recycled,
+                'timeouts': self._timeouts,
+                'max_size': self.max_size,
+            }
+
+    def close(self):
+        """Close every idle connection; checked-out ones are closed on return"""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        self._close_all(idle)
+
+    def _new_connection(self):
+        conn = self._connect()
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _take_stale(self):
+        # Called with the lock held; oldest idle connections sit on the left.
+        stale = []
+        cutoff = time.monotonic() - self.recycle
+        while self._idle and self._size > self.min_size and self._idle[0][1] < cutoff:
+            stale.append(self._idle.popleft()[0])
+            self._size -= 1
+            self._recycled += 1
+        return stale
+
+    def _close_all(self, connections):
+        for conn in connections:
+            self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Error:
+            pass
+
+
+# Everything the bot's queries need, including the core tables that used to
+# come from an external schema.sql. Never edit an applied migration; append a
+# new one.
+MIGRATIONS = [
+    Migration(1, 'core_tables', [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            telegram_id BIGINT NULL,
+            full_name VARCHAR(255) NOT NULL,
+            phone VARCHAR(20) NOT NULL,
+            email VARCHAR(255),
+            business_name VARCHAR(255),
+            business_address TEXT,
+            governorate VARCHAR(64),
+            annual_revenue VARCHAR(64),
+            business_type VARCHAR(32),
+            password_hash VARCHAR(255) NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_users_phone (phone)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            order_number VARCHAR(64) NOT NULL,
+            status VARCHAR(32) NOT NULL DEFAULT 'pending',
+            total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            created_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+            UNIQUE KEY uq_orders_order_number (order_number),
+            CONSTRAINT fk_orders_user FOREIGN KEY (user_id) REFERENCES users (id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS password_reset_tokens (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            token VARCHAR(64) NOT NULL,
+            expires_at DATETIME NOT NULL,
+            used BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT fk_password_reset_tokens_user FOREIGN KEY (user_id) REFERENCES users (id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    Migration(2, 'bot_tables', [
+        """
+        CREATE TABLE IF NOT EXISTS bot_watermarks (
+            name VARCHAR(64) PRIMARY KEY,
+            last_ts DATETIME(6) NOT NULL,
+            last_id BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            admin_telegram_id BIGINT NOT NULL,
+            message TEXT NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'running',
+            last_user_id BIGINT NOT NULL DEFAULT 0,
+            sent INT NOT NULL DEFAULT 0,
+            failed INT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    # Existing databases may already have some of these under other names;
+    # only the missing ones are created
+    Migration(3, 'lookup_indexes', LOOKUP_INDEXES),
+    Migration(4, 'leases', [
+        """
+        CREATE TABLE IF NOT EXISTS bot_leases (
+            name VARCHAR(64) PRIMARY KEY,
+            holder VARCHAR(128) NOT NULL,
+            expires_at DATETIME(6) NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    Migration(5, 'order_summary', [
+        """
+        CREATE TABLE IF NOT EXISTS user_order_summary (
+            user_id INT PRIMARY KEY,
+            pending_orders INT NOT NULL DEFAULT 0,
+            confirmed_orders INT NOT NULL DEFAULT 0,
+            shipped_orders INT NOT NULL DEFAULT 0,
+            delivered_orders INT NOT NULL DEFAULT 0,
+            cancelled_orders INT NOT NULL DEFAULT 0,
+            total_amount DECIMAL(16, 2) NOT NULL DEFAULT 0,
+            month CHAR(7) NULL,
+            month_amount DECIMAL(16, 2) NOT NULL DEFAULT 0,
+            last_order_at DATETIME(6) NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS order_summary_snapshots (
+            order_id INT PRIMARY KEY,
+            user_id INT NOT NULL,
+            status VARCHAR(32) NOT NULL,
+            total_amount DECIMAL(14, 2) NOT NULL,
+            created_at DATETIME(6) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    Migration(6, 'languages', [
+        Column('users', 'lang', 'VARCHAR(8) NULL'),
+        Column('broadcasts', 'locale', 'VARCHAR(8) NULL'),
+    ]),
+    Migration(7, 'order_notifications', [
+        """
+        CREATE TABLE IF NOT EXISTS order_notifications (
+            order_id INT PRIMARY KEY,
+            status VARCHAR(32) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        # Existing orders were announced by the in-memory notifier already
+        "INSERT IGNORE INTO order_notifications (order_id, status) SELECT id, status FROM orders",
+    ]),
+]
+INDEX_COLUMNS = """
+    SELECT index_name, column_name, non_unique FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = %s
+    ORDER BY index_name, seq_in_index
+"""
+TABLE_COLUMNS = """
+    SELECT column_name FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = %s
+"""
+
+# MySQL spellings of the statements that differ between backends
+SET_WATERMARK = """
+    INSERT INTO bot_watermarks (name, last_ts, last_id) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE last_ts = VALUES(last_ts), last_id = VALUES(last_id)
+"""
+LOCK_WATERMARK = "SELECT last_ts, last_id FROM bot_watermarks WHERE name = %s FOR UPDATE"
+INITIAL_WATERMARK = "SELECT NOW(6) - INTERVAL %s SECOND"
+ORDER_CHANGES = """
+    SELECT o.id, o.order_number, o.status, o.total_amount, o.user_id, o.created_at, o.updated_at, u.telegram_id, u.lang,
+           n.status AS notified_status
+    FROM orders o
+    JOIN users u ON u.id = o.user_id
+    LEFT JOIN order_notifications n ON n.order_id = o.id
+    WHERE (o.updated_at > %s OR (o.updated_at = %s AND o.id > %s))
+      AND o.updated_at < NOW(6) - INTERVAL %s SECOND
+    ORDER BY o.updated_at, o.id
+    LIMIT %s
+"""
+SET_NOTIFIED_STATUS = """
+    INSERT INTO order_notifications (order_id, status) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE status = VALUES(status)
+"""
+VERIFY_RESET_TOKEN = """
+    SELECT user_id FROM password_reset_tokens
+    WHERE token = %s AND expires_at > NOW() AND used = FALSE
+"""
+CONSUME_RESET_TOKEN = """
+    UPDATE password_reset_tokens SET used = TRUE
+    WHERE token = %s AND user_id = %s AND used = FALSE AND expires_at > NOW()
+"""
+SWEEP_RESET_TOKENS = "DELETE FROM password_reset_tokens WHERE used = TRUE OR expires_at < NOW() LIMIT %s"
+RENEW_LEASE = """
+    UPDATE bot_leases SET holder = %s, expires_at = NOW(6) + INTERVAL %s SECOND
+    WHERE name = %s AND (holder = %s OR expires_at < NOW(6))
+"""
+INSERT_LEASE = "INSERT IGNORE INTO bot_leases (name, holder, expires_at) VALUES (%s, %s, NOW(6) + INTERVAL %s SECOND)"
+
+
+class Database(Storage):
+    """MySQL storage backend on a pool of autocommit connections"""
+
+    errors = (Error,)
+    MIGRATIONS = MIGRATIONS
+    SET_WATERMARK = SET_WATERMARK
+    LOCK_WATERMARK = LOCK_WATERMARK
+    INITIAL_WATERMARK = INITIAL_WATERMARK
+    ORDER_CHANGES = ORDER_CHANGES
+    SET_NOTIFIED_STATUS = SET_NOTIFIED_STATUS
+    VERIFY_RESET_TOKEN = VERIFY_RESET_TOKEN
+    CONSUME_RESET_TOKEN = CONSUME_RESET_TOKEN
+    SWEEP_RESET_TOKENS = SWEEP_RESET_TOKENS
+    RENEW_LEASE = RENEW_LEASE
+    INSERT_LEASE = INSERT_LEASE
+
+    def __init__(self, hasher=None):
+        super().__init__(hasher)
         self.host = os.getenv('DB_HOST', 'localhost')
         self.user = os.getenv('DB_USER', 'root')
         self.password = os.getenv('DB_PASSWORD')
         self.database = os.getenv('DB_NAME', 'superstar_db')
-        self.connection = None
+        self.pool = ConnectionPool(
+            self._open_connection,
+            min_size=int(os.getenv('DB_POOL_MIN', '1')),
+            max_size=int(os.getenv('DB_POOL_MAX', '10')),
+            timeout=float(os.getenv('DB_POOL_TIMEOUT', '5')),
+            recycle=float(os.getenv('DB_POOL_RECYCLE', '1800')),
+            validate_after=float(os.getenv('DB_POOL_VALIDATE_AFTER', '30')),
+        )
+        self.concurrency = self.pool.max_size
+
+    def _open_connection(self):
+        return mysql.connector.connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            charset='utf8mb4',
+            collation='utf8mb4_unicode_ci',
+            # Single statements commit on their own; transaction() opens explicit ones
+            autocommit=True
+        )
 
     def connect(self):
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-                charset='utf8mb4',
-                collation='utf8mb4_unicode_ci'
-            )
+            self.pool.fill()
             return True
         except Error as e:
-            print(f"Error connecting to database: {e}")
+            logger.error("Error connecting to database: %s", e)
             return False
 
     def disconnect(self):
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        self.pool.close()
 
-    def execute_query(self, query, params=None):
-        try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-            
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(query, params)
-            
-            if query.strip().upper().startswith('SELECT'):
-                result = cursor.fetchall()
-            else:
-                self.connection.commit()
-                result = cursor.lastrowid if cursor.lastrowid else True
-            
-            cursor.close()
-            return result
-        except Error as e:
-            print(f"Database error: {e}")
-            return None
-
-    def user_exists_by_phone(self, phone):
-        """Check if user exists by phone number"""
-        query = "SELECT id, telegram_id FROM users WHERE phone = %s"
-        result = self.execute_query(query, (phone,))
-        return result[0] if result else None
-
-    def user_exists_by_telegram_id(self, telegram_id):
-        """Check if user exists by Telegram ID"""
-        query = "SELECT id, phone, full_name FROM users WHERE telegram_id = %s"
-        result = self.execute_query(query, (telegram_id,))
-        return result[0] if result else None
-
-    def create_user(self, user_data):
-        """Create new user account"""
-        try:
-            # Hash password
-            password_hash = bcrypt.hashpw(user_data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            
-            query = """
-                INSERT INTO users (telegram_id, full_name, phone, email, business_name, 
-                                 business_address, governorate, annual_revenue, business_type, password_hash)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            params = (
-                user_data['telegram_id'],
-                user_data['full_name'],
-                user_data['phone'],
-                user_data['email'],
-                user_data['business_name'],
-                user_data['business_address'],
-                user_data['governorate'],
-                user_data['annual_revenue'],
-                user_data['business_type'],
-                password_hash
-            )
-            
-            result = self.execute_query(query, params)
-            return result
-        except Exception as e:
-            print(f"Error creating user: {e}")
-            return None
-
-    def verify_password(self, phone, password):
-        """Verify user password"""
-        query = "SELECT id, password_hash, full_name, status FROM users WHERE phone = %s"
-        result = self.execute_query(query, (phone,))
-        
-        if result and len(result) > 0:
-            user = result[0]
-            if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
-                return user
-        return None
-
-    def update_telegram_id(self, phone, telegram_id):
-        """Update user's Telegram ID after successful login"""
-        query = "UPDATE users SET telegram_id = %s WHERE phone = %s"
-        return self.execute_query(query, (telegram_id, phone))
-
-    def get_user_orders(self, user_id, limit=5):
-        """Get user's recent orders"""
-        query = """
-            SELECT o.order_number, o.status, o.total_amount, o.created_at
-            FROM orders o
-            WHERE o.user_id = %s
-            ORDER BY o.created_at DESC
-            LIMIT %s
+    def pool_stats(self):
+        """Connection pool counters (size, idle, in use, waiting, created, ...)"""
+        return self.pool.stats()
+
+    def open_connections(self):
+        # Every connection the workers will use, not just min_size
+        self.pool.fill(int(os.getenv('DB_POOL_WARM', str(self.pool.max_size))))
+
+    @contextmanager
+    def transaction(self):
+        """Run every query inside the block on one connection, committed together.
+
+        Nested blocks join the outer transaction. Any exception rolls the
+        whole transaction back. Avoid slow work such as bcrypt inside the
+        block, since it holds a pooled connection and row locks.
         """
-        return self.execute_query(query, (user_id, limit))
-
-    def create_password_reset_token(self, user_id):
-        """Create password reset token"""
-        token = secrets.token_urlsafe(32)
-        expires_at = datetime.now() + timedelta(hours=1)
-        
-        query = """
-            INSERT INTO password_reset_tokens (user_id, token, expires_at)
-            VALUES (%s, %s, %s)
+        if getattr(self._local, 'connection', None) is not None:
+            yield self._local.connection
+            return
+
+        with self.pool.connection() as connection:
+            connection.start_transaction()
+            self._local.connection = connection
+            try:
+                yield connection
+                connection.commit()
+            except BaseException:
+                try:
+                    connection.rollback()
+                except Error:
+                    pass
+                raise
+            finally:
+                self._local.connection = None
+
+    @contextmanager
+    def _connection(self):
+        """The current transaction's connection, or a pooled one for a single statement"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            yield connection
+        else:
+            with self.pool.connection() as connection:
+                yield connection
+
+    # Typed query API. These raise mysql.connector.Error; inside
+    # transaction() they run on the transaction's connection.
+
+    def fetch_all(self, query, params=None, dictionary=False):
+        """Run a query and return all rows as tuples (or dicts)"""
+        with self._connection() as connection:
+            cursor = connection.cursor(dictionary=dictionary)
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    def iter_rows(self, query, params=None, dictionary=False, chunk_size=1000):
+        """Stream a query's rows from an unbuffered cursor, ``chunk_size`` at a time.
+
+        A pooled connection stays checked out until the generator is
+        exhausted or closed, so consume it promptly.
         """
-        result = self.execute_query(query, (user_id, token, expires_at))
-        return token if result else None
-
-    def verify_reset_token(self, token):
-        """Verify password reset token"""
-        query = """
-            SELECT user_id FROM password_reset_tokens
-            WHERE token = %s AND expires_at > NOW() AND used = FALSE
+        with self._connection() as connection:
+            cursor = connection.cursor(buffered=False, dictionary=dictionary)
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                if connection.unread_result:
+                    # Stopped early: drain the rest so the connection can be reused
+                    connection.consume_results()
+                cursor.close()
+
+    def execute(self, query, params=None):
+        """Run a write statement; returns (rowcount, lastrowid)"""
+        with self._connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(query, params)
+                return ExecResult(cursor.rowcount, cursor.lastrowid)
+            finally:
+                cursor.close()
+
+    def execute_many(self, query, seq_params):
+        """Run one statement for many parameter rows in a single transaction.
+
+        INSERT ... VALUES statements are sent as batched multi-row inserts.
+        Returns the total row count.
         """
-        result = self.execute_query(query, (token,))
-        return result[0]['user_id'] if result else None
+        with self.transaction() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.executemany(query, seq_params)
+                return cursor.rowcount
+            finally:
+                cursor.close()
 
-    def reset_password(self, user_id, new_password, token):
-        """Reset user password"""
-        try:
-            password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            
-            # Update password
-            query1 = "UPDATE users SET password_hash = %s WHERE id = %s"
-            result1 = self.execute_query(query1, (password_hash, user_id))
-            
-            # Mark token as used
-            query2 = "UPDATE password_reset_tokens SET used = TRUE WHERE token = %s"
-            result2 = self.execute_query(query2, (token,))
-            
-            return result1 and result2
-        except Exception as e:
-            print(f"Error resetting password: {e}")
-            return False
+    def index_columns(self, table):
+        indexes = {}
+        for name, column, non_unique in self.fetch_all(INDEX_COLUMNS, (table,)):
+            columns, _ = indexes.get(name, ((), not non_unique))
+            indexes[name] = (columns + (column,), not non_unique)
+        return indexes
+
+    def table_columns(self, table):
+        return {row[0] for row in self.fetch_all(TABLE_COLUMNS, (table,))}
+
+    def full_scans(self, query, params=None):
+        # type=ALL with no candidate key means no index can serve the query. On
+        # tiny tables MySQL may pick ALL despite a usable key; that's not flagged.
+        plan = self.fetch_all("EXPLAIN " + query, params, dictionary=True)
+        return [row['table'] for row in plan if row['type'] == 'ALL' and not row['possible_keys']]
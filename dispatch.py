@@ -0,0 +1,92 @@
+import time
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from metrics import UPDATES
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently while keeping each chat/user in order.
+
+    Updates that share a (chat, user) key run one after another, in the order
+    they arrived, so ConversationHandler state transitions never interleave;
+    updates for different keys run in parallel on up to ``workers`` slots.
+
+    A waiting update takes a worker slot only once it is at the head of its
+    own key's line, so one user with a deep backlog cannot occupy all the
+    slots. ``max_pending`` bounds the total number of admitted updates
+    (running or waiting) and is what the base class semaphore enforces.
+    """
+
+    def __init__(self, workers=8, max_pending=None):
+        super().__init__(max_pending or workers * 32)
+        self.workers = workers
+        self._slots = asyncio.BoundedSemaphore(workers)
+        self._locks = {}
+        self._backlog = {}
+        self.update_queue = None
+        self.active = 0
+        self.processed = 0
+        self.last_processed_at = None
+
+    @staticmethod
+    def _key(update):
+        if isinstance(update, Update):
+            chat = update.effective_chat
+            user = update.effective_user
+            if chat or user:
+                return (chat.id if chat else None, user.id if user else None)
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        key = self._key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._backlog[key] = self._backlog.get(key, 0) + 1
+        try:
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            remaining = self._backlog[key] - 1
+            if remaining:
+                self._backlog[key] = remaining
+            else:
+                # Nobody else queued for this key; drop its lock to stay bounded
+                del self._backlog[key]
+                del self._locks[key]
+
+    async def _run(self, coroutine):
+        async with self._slots:
+            self.active += 1
+            try:
+                await coroutine
+            finally:
+                self.active -= 1
+                self.processed += 1
+                self.last_processed_at = time.time()
+                UPDATES.inc()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def stats(self):
+        """Dispatch counters: running, admitted and per-key backlog"""
+        backlog = self._backlog.values()
+        return {
+            'queued': self.update_queue.qsize() if self.update_queue else 0,
+            'workers': self.workers,
+            'active': self.active,
+            'pending': sum(backlog),
+            'users_with_backlog': sum(1 for depth in backlog if depth > 1),
+            'max_user_backlog': max(backlog, default=0),
+            'processed': self.processed,
+            'last_processed_at': self.last_processed_at,
+        }
@@ -0,0 +1,92 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from periodic import run_periodically
+
+logger = logging.getLogger(__name__)
+
+
+class Health:
+    """Liveness and readiness of this process, as served on /healthz and /readyz.
+
+    Everything is read from state the process keeps anyway: the event-loop
+    lag sampler, the dispatcher's counters and a database ping that runs in
+    the background every ``db_interval`` seconds. A probe never waits for the
+    database itself.
+
+    Live means the event loop keeps up. Ready also needs the startup warm-up
+    to have succeeded and the last database ping to have succeeded recently.
+    """
+
+    def __init__(self, db, update_processor=None, max_loop_lag=None, db_interval=None, db_timeout=None):
+        self.db = db
+        self.update_processor = update_processor
+        self.max_loop_lag = max_loop_lag or float(os.getenv('HEALTH_MAX_LOOP_LAG', '2'))
+        self.db_interval = db_interval or float(os.getenv('HEALTH_DB_INTERVAL', '10'))
+        self.db_timeout = db_timeout or float(os.getenv('HEALTH_DB_TIMEOUT', '3'))
+        self.started = time.monotonic()
+        self.ready = False
+        self.warmup = None
+        self.loop_lag = None
+        self._loop_sampled = None
+        self.db_ok = None
+        self.db_latency = None
+        self._db_checked = None
+
+    def record_loop_lag(self, lag):
+        self.loop_lag = lag
+        self._loop_sampled = time.monotonic()
+
+    async def check_database(self):
+        started = time.monotonic()
+        try:
+            ok = await asyncio.wait_for(self.db.ping(), self.db_timeout)
+        except asyncio.TimeoutError:
+            ok = False
+        if ok != self.db_ok and self.db_ok is not None:
+            logger.warning("Database health changed: %s", "ok" if ok else "failing")
+        self.db_ok = ok
+        self.db_latency = time.monotonic() - started
+        self._db_checked = time.monotonic()
+        return ok
+
+    async def watch_database(self):
+        """Ping the database every ``db_interval`` seconds until cancelled"""
+        await run_periodically(self.check_database, self.db_interval, "Database health check")
+
+    def live(self):
+        now = time.monotonic()
+        if self._loop_sampled is None:
+            # The sampler hasn't reported yet; only a stall after startup counts
+            return now - self.started < self.max_loop_lag * 5
+        return self.loop_lag < self.max_loop_lag and now - self._loop_sampled < self.max_loop_lag * 5
+
+    def is_ready(self):
+        db_fresh = self._db_checked is not None and time.monotonic() - self._db_checked < self.db_interval * 3
+        # warm_up() reports its failure as None
+        warmed_up = self.warmup is not None
+        return self.ready and warmed_up and self.db_ok and db_fresh and self.live()
+
+    def report(self):
+        now = time.monotonic()
+        stats = self.update_processor.stats() if self.update_processor else {}
+        last_update = stats.get('last_processed_at')
+        return {
+            'live': self.live(),
+            'ready': bool(self.is_ready()),
+            'uptime_s': round(now - self.started, 1),
+            'event_loop_lag_ms': round(self.loop_lag * 1000, 2) if self.loop_lag is not None else None,
+            'last_update_at': datetime.fromtimestamp(last_update).isoformat(timespec='seconds') if last_update else None,
+            'last_update_age_s': round(time.time() - last_update, 1) if last_update else None,
+            'updates_processed': stats.get('processed'),
+            'updates_pending': stats.get('pending'),
+            'db': {
+                'ok': self.db_ok,
+                'latency_ms': round(self.db_latency * 1000, 2) if self.db_latency is not None else None,
+                'checked_age_s': round(now - self._db_checked, 1) if self._db_checked is not None else None,
+                'pool': self.db.database.pool_stats(),
+            },
+            'warmup': self.warmup,
+        }
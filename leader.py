@@ -0,0 +1,84 @@
+import os
+import time
+import socket
+import asyncio
+import secrets
+import logging
+from metrics import LEADER
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """Picks the one replica that runs polling and the background jobs.
+
+    Leadership is a row in bot_leases with an expiry on the database clock.
+    Every replica tries to take or renew it each ``heartbeat`` seconds; only
+    the holder (or anyone, once it has expired) succeeds. A leader that
+    can't renew steps down a heartbeat before its lease could run out, so
+    two replicas never lead at once. A replica that dies stops renewing and
+    is replaced within ``ttl`` seconds; one that shuts down cleanly
+    releases the lease and is replaced on the next heartbeat.
+
+    With LEADER_ELECTION=0 (a single replica) the process leads without a lease.
+    """
+
+    def __init__(self, db, name='leader', holder=None, ttl=None, heartbeat=None, enabled=None):
+        self.db = db
+        self.enabled = enabled if enabled is not None else os.getenv('LEADER_ELECTION', '1') == '1'
+        self.name = name
+        self.holder = holder or os.getenv('REPLICA_ID') or f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"
+        self.ttl = ttl or float(os.getenv('LEADER_LEASE_TTL', '15'))
+        self.heartbeat = heartbeat or float(os.getenv('LEADER_HEARTBEAT', '3'))
+        if self.heartbeat * 2 >= self.ttl:
+            raise ValueError("LEADER_HEARTBEAT must be less than half of LEADER_LEASE_TTL")
+        self.is_leader = False
+        self._valid_until = 0.0
+
+    async def run(self, on_elected, on_demoted):
+        """Campaign until cancelled, awaiting ``on_elected``/``on_demoted`` on every change"""
+        if not self.enabled:
+            await self._change(True, on_elected)
+            await asyncio.Event().wait()
+        while True:
+            started = time.monotonic()
+            # A leader must hear back before its lease could lapse; a hung
+            # request counts as the database being unreachable
+            timeout = self._valid_until - self.heartbeat - started if self.is_leader else self.ttl
+            try:
+                held = await asyncio.wait_for(
+                    self.db.acquire_lease(self.name, self.holder, self.ttl), max(timeout, 0))
+            except asyncio.TimeoutError:
+                logger.warning("Lease request timed out after %.1fs", timeout)
+                held = None
+            except Exception:
+                logger.exception("Lease request failed")
+                held = None
+            if held:
+                # Measured from before the request, so never later than the database's expiry
+                self._valid_until = started + self.ttl
+                if not self.is_leader:
+                    await self._change(True, on_elected)
+            elif self.is_leader:
+                # False: someone else has it. None: the database is unreachable
+                # or too slow, and the lease still covers us until just before
+                # it can expire.
+                if held is False or time.monotonic() >= self._valid_until - self.heartbeat:
+                    await self._change(False, on_demoted)
+            await asyncio.sleep(self.heartbeat)
+
+    async def resign(self, on_demoted):
+        """Stop leading and free the lease for the next replica"""
+        if self.is_leader:
+            await self._change(False, on_demoted)
+            if self.enabled:
+                await self.db.release_lease(self.name, self.holder)
+
+    async def _change(self, leading, callback):
+        self.is_leader = leading
+        LEADER.set(1 if leading else 0)
+        logger.info("Replica %s %s", self.holder, "is now the leader" if leading else "stepped down as leader")
+        try:
+            await callback()
+        except Exception:
+            logger.exception("Leader %s callback failed", "election" if leading else "demotion")
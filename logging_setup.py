@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import traceback
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Request-scoped fields, set per update by metrics.timed_handler. Each update
+# runs in its own task, so concurrent handlers never see each other's values.
+current_user_id = ContextVar('current_user_id', default=None)
+current_state = ContextVar('current_state', default=None)
+
+# Fields copied from ``extra=`` (or the context) into the JSON line when present
+CONTEXT_FIELDS = ('user_id', 'state', 'duration_ms')
+
+
+class ContextQueueHandler(QueueHandler):
+    """Hands records to the listener thread with only the cheap work done here.
+
+    The message is interpolated and the request context attached on the
+    calling thread (the listener can't see its contextvars, and arguments
+    may change after the call). Debug records are sampled before anything
+    else, and when the queue is full the record is dropped rather than
+    blocking the event loop.
+    """
+
+    def __init__(self, log_queue, debug_sample_rate=1.0):
+        super().__init__(log_queue)
+        self.debug_sample_rate = debug_sample_rate
+        self.dropped = 0
+
+    def emit(self, record):
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1 and random.random() >= self.debug_sample_rate:
+            return
+        super().emit(record)
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        if getattr(record, 'user_id', None) is None:
+            record.user_id = current_user_id.get()
+        if getattr(record, 'state', None) is None:
+            record.state = current_state.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and context fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """Rolls the file over when it reaches ``max_bytes`` or every ``interval`` seconds"""
+
+    def __init__(self, filename, max_bytes, backup_count, interval):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+
+def configure_logging():
+    """Route all logging through a queue to a background writer thread.
+
+    Files go to LOG_DIR as JSON lines, rotated by size (LOG_MAX_BYTES) and
+    age (LOG_ROTATE_SECONDS); LOG_CONSOLE also echoes plain lines to stderr.
+    Returns the started listener; it is stopped at exit, flushing the queue.
+    """
+    level = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    log_dir = os.getenv('LOG_DIR', 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = SizeAndTimeRotatingFileHandler(
+        os.path.join(log_dir, os.getenv('LOG_FILE', 'bot.jsonl')),
+        max_bytes=int(os.getenv('LOG_MAX_BYTES', str(20 * 1024 * 1024))),
+        backup_count=int(os.getenv('LOG_BACKUPS', '10')),
+        interval=float(os.getenv('LOG_ROTATE_SECONDS', '86400'))
+    )
+    file_handler.setFormatter(JSONFormatter())
+    handlers = [file_handler]
+    if os.getenv('LOG_CONSOLE', '1') == '1':
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        handlers.append(console)
+
+    log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+    queue_handler = ContextQueueHandler(log_queue, float(os.getenv('LOG_DEBUG_SAMPLE', '0.01')))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    # Per-request HTTP lines from the Bot API client would drown everything else
+    logging.getLogger('httpx').setLevel(max(level, logging.WARNING))
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
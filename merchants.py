@@ -0,0 +1,265 @@
+"""Bulk import and export of merchant accounts.
+
+    python merchants.py import merchants.csv [--report errors.csv] [--batch-size 500] [--dry-run]
+    python merchants.py export merchants.jsonl
+
+Files are CSV (with a header row) or JSON Lines, picked by extension or
+--format. Imported rows carry full_name, phone, password and optionally
+email, business_name, business_address, governorate, annual_revenue and
+business_type, and are checked with the same rules as the registration
+conversation. Accounts are created unbound; the merchant links Telegram by
+logging in.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+from passwords import PasswordHasher
+from catalog import GOVERNORATES, REVENUE_RANGES, BUSINESS_TYPES
+from validation import is_valid_phone, is_valid_email, normalize_contact_phone, password_error
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = (
+    'id', 'telegram_id', 'full_name', 'phone', 'email', 'business_name', 'business_address',
+    'governorate', 'annual_revenue', 'business_type', 'status', 'created_at'
+)
+
+
+def file_format(path, requested=None):
+    if requested:
+        return requested
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_records(stream, fmt):
+    """Yield (line number, record dict or None, parse error) for every input row"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"invalid JSON: {e}"
+            continue
+        if isinstance(record, dict):
+            yield line_number, record, None
+        else:
+            yield line_number, None, "not a JSON object"
+
+
+def _coded(values, value, default):
+    # Accept the stored code or its label in any locale, like the registration keyboards
+    if not value:
+        return default
+    return value if value in set(values) else values.code(value)
+
+
+def prepare_merchant(record):
+    """(user row without password_hash, password) for one input record; ValueError if invalid"""
+    def field(name):
+        value = record.get(name)
+        return str(value).strip() if value is not None else ''
+
+    full_name = field('full_name')
+    if len(full_name) < 6:
+        raise ValueError("full_name is shorter than 6 characters")
+    phone = field('phone')
+    if not is_valid_phone(phone):
+        # Distributor lists often carry the international form (+964 7XX ...)
+        phone = normalize_contact_phone(phone)
+        if not is_valid_phone(phone):
+            raise ValueError("phone is not an Iraqi mobile number (07XXXXXXXXX)")
+    email = field('email')
+    if email and not is_valid_email(email):
+        raise ValueError("email is not valid")
+    password = field('password')
+    error = password_error(password)
+    if error:
+        raise ValueError({
+            'password_too_short': "password is shorter than 8 characters",
+            'password_needs_mix': "password needs both letters and digits",
+        }[error])
+
+    governorate = field('governorate')
+    governorate = GOVERNORATES.code(governorate, governorate) or None
+    annual_revenue = _coded(REVENUE_RANGES, field('annual_revenue'), 'less_than_50k')
+    business_type = _coded(BUSINESS_TYPES, field('business_type'), 'retail')
+    if annual_revenue is None:
+        raise ValueError("annual_revenue is not a known range")
+    if business_type is None:
+        raise ValueError("business_type is not wholesale or retail")
+
+    user = {
+        'telegram_id': None,
+        'full_name': full_name,
+        'phone': phone,
+        'email': email or None,
+        'business_name': field('business_name') or None,
+        'business_address': field('business_address') or None,
+        'governorate': governorate,
+        'annual_revenue': annual_revenue,
+        'business_type': business_type,
+        'lang': None,
+    }
+    return user, password
+
+
+class MerchantImporter:
+    """Streams merchant records into the users table in batches.
+
+    Each batch is validated, checked against existing phones, hashed on a
+    bcrypt thread pool (bcrypt releases the GIL, so the threads keep every
+    core busy) and written as one multi-row INSERT transaction. Only one
+    batch of rows is held at a time, and every rejected row is reported
+    with its line number and reason.
+    """
+
+    def __init__(self, database, hasher, batch_size=500, dry_run=False):
+        self.database = database
+        self.hasher = hasher
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.imported = 0
+        self.rejected = []
+        self._seen_phones = set()
+
+    def reject(self, line_number, phone, error):
+        self.rejected.append((line_number, phone, error))
+
+    def run(self, records):
+        batch = []
+        for line_number, record, error in records:
+            if error:
+                self.reject(line_number, '', error)
+                continue
+            try:
+                user, password = prepare_merchant(record)
+            except ValueError as e:
+                self.reject(line_number, str(record.get('phone') or ''), str(e))
+                continue
+            if user['phone'] in self._seen_phones:
+                self.reject(line_number, user['phone'], "phone appears earlier in the file")
+                continue
+            self._seen_phones.add(user['phone'])
+            batch.append((line_number, user, password))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+
+    def flush(self, batch):
+        taken = self.database.existing_phones([user['phone'] for _, user, _ in batch])
+        if taken is None:
+            raise RuntimeError("could not check existing phone numbers")
+        fresh = []
+        for line_number, user, password in batch:
+            if user['phone'] in taken:
+                self.reject(line_number, user['phone'], "phone is already registered")
+            else:
+                fresh.append((line_number, user, password))
+        if self.dry_run:
+            # Counted as importable; nothing is hashed or written
+            self.imported += len(fresh)
+            return
+        if not fresh:
+            return
+
+        hashes = self.hasher.hash_many([password for _, _, password in fresh])
+        users = [dict(user, password_hash=password_hash) for (_, user, _), password_hash in zip(fresh, hashes)]
+        failed = self.database.insert_users(users)
+        for position, error in failed.items():
+            line_number, user, _ = fresh[position]
+            self.reject(line_number, user['phone'], error)
+        self.imported += len(fresh) - len(failed)
+        logger.info("Imported %d merchants so far (%d rejected)", self.imported, len(self.rejected))
+
+
+def import_merchants(database, args):
+    workers = int(os.getenv('IMPORT_HASH_WORKERS', str(os.cpu_count() or 1)))
+    # The whole batch is queued at once, so the queue must hold it
+    hasher = PasswordHasher(max_concurrency=workers, max_queue=args.batch_size)
+    importer = MerchantImporter(database, hasher, args.batch_size, args.dry_run)
+    started = time.monotonic()
+    try:
+        with open(args.path, newline='', encoding='utf-8-sig') as stream:
+            importer.run(read_records(stream, file_format(args.path, args.format)))
+    finally:
+        hasher.shutdown()
+
+    if args.report and importer.rejected:
+        with open(args.report, 'w', newline='', encoding='utf-8') as report:
+            writer = csv.writer(report)
+            writer.writerow(('line', 'phone', 'error'))
+            writer.writerows(importer.rejected)
+    elif importer.rejected:
+        for line_number, phone, error in importer.rejected:
+            print(f"line {line_number}: {phone or '-'}: {error}", file=sys.stderr)
+
+    verb = "Would import" if args.dry_run else "Imported"
+    print(f"{verb} {importer.imported} merchants, rejected {len(importer.rejected)}, in {time.monotonic() - started:.1f}s")
+    return 1 if importer.rejected else 0
+
+
+def _jsonable(value):
+    return value.isoformat(sep=' ') if isinstance(value, datetime) else value
+
+
+def export_merchants(database, args):
+    fmt = file_format(args.path, args.format)
+    stream = sys.stdout if args.path == '-' else open(args.path, 'w', newline='', encoding='utf-8')
+    exported = 0
+    try:
+        if fmt == 'csv':
+            writer = csv.DictWriter(stream, EXPORT_FIELDS)
+            writer.writeheader()
+        for user in database.iter_users():
+            if fmt == 'csv':
+                writer.writerow({key: _jsonable(value) for key, value in user.items()})
+            else:
+                stream.write(json.dumps({key: _jsonable(value) for key, value in user.items()}, ensure_ascii=False) + '\n')
+            exported += 1
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    print(f"Exported {exported} merchants", file=sys.stderr)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import and export merchant accounts")
+    parser.add_argument('command', choices=('import', 'export'))
+    parser.add_argument('path', help="input or output file ('-' exports to stdout)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="default: from the file extension")
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('IMPORT_BATCH_SIZE', '500')))
+    parser.add_argument('--report', help="write rejected rows to this CSV instead of stderr")
+    parser.add_argument('--dry-run', action='store_true', help="validate only, write nothing")
+    args = parser.parse_args()
+    logging.basicConfig(format='%(levelname)s %(message)s', level=logging.INFO)
+
+    from storage import create_database
+    database = create_database()
+    if not database.connect():
+        return 1
+    try:
+        if not database.ensure_schema():
+            return 1
+        if args.command == 'import':
+            return import_merchants(database, args)
+        return export_merchants(database, args)
+    finally:
+        database.disconnect()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
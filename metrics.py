@@ -0,0 +1,135 @@
+import time
+import asyncio
+import logging
+import functools
+from logging_setup import current_user_id, current_state
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets from a cached lookup up to a slow bcrypt + MySQL round trip
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HANDLER_SECONDS = Histogram(
+    'superstar_handler_seconds', 'Time spent handling one update, by conversation state',
+    ['state'], buckets=LATENCY_BUCKETS
+)
+UPDATES = Counter('superstar_updates_total', 'Updates processed by the dispatcher')
+DB_SECONDS = Histogram(
+    'superstar_db_seconds', 'Time spent in a Database method on a worker thread',
+    ['method'], buckets=LATENCY_BUCKETS
+)
+DB_WAIT_SECONDS = Histogram(
+    'superstar_db_wait_seconds', 'Time a Database call waited for a free worker thread',
+    buckets=LATENCY_BUCKETS
+)
+DB_ERRORS = Counter('superstar_db_errors_total', 'Database method calls that failed', ['method'])
+BCRYPT_SECONDS = Histogram(
+    'superstar_bcrypt_seconds', 'Time spent in bcrypt per password operation',
+    ['operation'], buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+)
+BCRYPT_REJECTED = Counter('superstar_bcrypt_rejected_total', 'Password operations refused because the queue was full')
+LOGIN_THROTTLED = Counter('superstar_login_throttled_total', 'Login attempts refused by the attempt limits, before any bcrypt work')
+EVENT_LOOP_LAG = Histogram(
+    'superstar_event_loop_lag_seconds', 'How late the event loop resumed a sleeping task',
+    buckets=LATENCY_BUCKETS
+)
+LEADER = Gauge('superstar_leader', '1 while this replica holds the leader lease and runs polling and jobs')
+ACTIVE_CONVERSATIONS = Gauge('superstar_active_conversations', 'Registration/login conversations in progress')
+DISPATCH_ACTIVE = Gauge('superstar_dispatch_active_updates', 'Updates currently running in a handler')
+DISPATCH_PENDING = Gauge('superstar_dispatch_pending_updates', 'Updates admitted by the dispatcher, running or waiting')
+DISPATCH_QUEUED = Gauge('superstar_dispatch_queued_updates', 'Updates waiting in the update queue')
+DISPATCH_USERS_WITH_BACKLOG = Gauge('superstar_dispatch_users_with_backlog', 'Users with updates waiting behind their running one')
+DISPATCH_MAX_USER_BACKLOG = Gauge('superstar_dispatch_max_user_backlog', 'Most updates admitted for a single user')
+RATE_LIMITER = Gauge('superstar_rate_limiter', 'Outgoing Bot API pacing (queued requests, sends, RetryAfter pauses)', ['stat'])
+USER_CACHE = Gauge('superstar_user_cache', 'Telegram ID user cache size and hit/miss/eviction counts', ['stat'])
+LOGIN_THROTTLE = Gauge('superstar_login_throttle', 'Login attempt windows, lockouts and refused attempts', ['stat'])
+
+
+def timed_handler(state, callback):
+    """Wrap a handler callback so its run time is recorded under ``state``.
+
+    While it runs, log records carry the user id and state; each run ends
+    with a (sampled) debug record holding its duration.
+    """
+    histogram = HANDLER_SECONDS.labels(state)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        user = update.effective_user
+        user_token = current_user_id.set(user.id if user else None)
+        state_token = current_state.set(state)
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            histogram.observe(elapsed)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Handled update", extra={'duration_ms': round(elapsed * 1000, 2)})
+            current_state.reset(state_token)
+            current_user_id.reset(user_token)
+    return wrapper
+
+
+def watch_dispatcher(update_processor):
+    """Export the dispatcher's live counters, read at scrape time"""
+    DISPATCH_ACTIVE.set_function(lambda: update_processor.active)
+    DISPATCH_PENDING.set_function(lambda: update_processor.stats()['pending'])
+    DISPATCH_QUEUED.set_function(lambda: update_processor.stats()['queued'])
+    DISPATCH_USERS_WITH_BACKLOG.set_function(lambda: update_processor.stats()['users_with_backlog'])
+    DISPATCH_MAX_USER_BACKLOG.set_function(lambda: update_processor.stats()['max_user_backlog'])
+
+
+def watch_conversations(conversation_handler):
+    # PTB keeps no public count; the handler's key -> state dict is the source of truth
+    ACTIVE_CONVERSATIONS.set_function(lambda: len(conversation_handler._conversations))
+
+
+def _flatten(stats):
+    # {'queued': {'bulk': 3}} -> {'queued_bulk': 3}
+    flat = {}
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            flat.update((f"{key}_{inner}", inner_value) for inner, inner_value in value.items())
+        else:
+            flat[key] = value
+    return flat
+
+
+def _watch_stats(gauge, stats):
+    # One child per entry of a component's stats() dict, read at scrape time
+    for key in _flatten(stats()):
+        gauge.labels(key).set_function(lambda key=key: _flatten(stats()).get(key) or 0)
+
+
+def watch_rate_limiter(rate_limiter):
+    """Export PriorityRateLimiter.stats() as superstar_rate_limiter{stat=...}"""
+    _watch_stats(RATE_LIMITER, rate_limiter.stats)
+
+
+def watch_user_cache(database):
+    """Export the user cache's stats as superstar_user_cache{stat=...}"""
+    _watch_stats(USER_CACHE, database.cache_stats)
+
+
+def watch_login_throttle(login_throttle):
+    """Export LoginThrottle.stats() as superstar_login_throttle{stat=...}"""
+    _watch_stats(LOGIN_THROTTLE, login_throttle.stats)
+
+
+async def monitor_event_loop(interval=0.5, on_sample=None):
+    """Sample event-loop lag until cancelled: anything blocking the loop shows up here"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        EVENT_LOOP_LAG.observe(lag)
+        if on_sample:
+            on_sample(lag)
+
+
+def render():
+    """Current metrics in the Prometheus text format, with its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,124 @@
+"""Versioned schema migrations and the query-plan check, shared by every backend.
+
+Each backend lists its migrations in its MIGRATIONS attribute; Storage.ensure_schema
+applies the ones not yet recorded in schema_migrations. Every step is idempotent
+(CREATE ... IF NOT EXISTS, an Index that is only created when no existing
+index covers its columns, or a Column only added when the table lacks it), so
+a half-applied migration is simply run again.
+
+    python migrations.py migrate          apply pending migrations
+    python migrations.py status           list applied and pending migrations
+    python migrations.py check [--strict] EXPLAIN the hot queries, report full scans
+"""
+import sys
+import logging
+import argparse
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple('Migration', ['version', 'name', 'steps'])
+
+
+class Index(namedtuple('Index', ['table', 'name', 'columns', 'unique'], defaults=(False,))):
+    """A secondary index a query depends on; the same CREATE INDEX works on MySQL and SQLite"""
+
+    __slots__ = ()
+
+    def covered_by(self, columns, unique):
+        """Whether an existing index on ``columns`` serves the same lookups"""
+        if self.unique:
+            return unique and tuple(columns) == self.columns
+        return tuple(columns[:len(self.columns)]) == self.columns
+
+    def create_statement(self):
+        kind = 'UNIQUE INDEX' if self.unique else 'INDEX'
+        return f"CREATE {kind} {self.name} ON {self.table} ({', '.join(self.columns)})"
+
+
+class Column(namedtuple('Column', ['table', 'name', 'definition'])):
+    """A column added to an existing table; ``definition`` is in the backend's own dialect"""
+
+    __slots__ = ()
+
+    def add_statement(self):
+        return f"ALTER TABLE {self.table} ADD COLUMN {self.name} {self.definition}"
+
+
+SCHEMA_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(128) NOT NULL,
+        applied_at DATETIME NOT NULL
+    )
+"""
+APPLIED_MIGRATIONS = "SELECT version, name, applied_at FROM schema_migrations ORDER BY version"
+MIGRATION_APPLIED = "SELECT 1 FROM schema_migrations WHERE version = %s"
+RECORD_MIGRATION = "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)"
+
+# The indexes behind every hot lookup; find_full_scans checks they are used
+LOOKUP_INDEXES = [
+    Index('users', 'idx_users_phone', ('phone',)),
+    Index('users', 'idx_users_telegram_id', ('telegram_id',)),
+    Index('orders', 'idx_orders_user_created', ('user_id', 'created_at', 'id')),
+    Index('orders', 'idx_orders_updated', ('updated_at', 'id')),
+    Index('password_reset_tokens', 'uq_password_reset_tokens_token', ('token',), unique=True),
+    Index('broadcasts', 'idx_broadcasts_status', ('status',)),
+]
+
+QUERY_PLAN_MODES = ('off', 'warn', 'fail')
+
+
+async def check_query_plans(db, mode='warn'):
+    """Startup check: log hot queries that scan a whole table, and refuse to start in 'fail' mode"""
+    if mode not in QUERY_PLAN_MODES:
+        raise ValueError(f"Unknown QUERY_PLAN_CHECK: {mode}")
+    if mode == 'off':
+        return
+    scans = await db.find_full_scans()
+    if scans is None:
+        logger.warning("Could not check query plans")
+        return
+    for name, tables in scans.items():
+        logger.warning("Query %s scans the whole of %s", name, ', '.join(tables))
+    if scans and mode == 'fail':
+        raise RuntimeError(f"Queries without a usable index: {', '.join(scans)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the bot's database schema")
+    parser.add_argument('command', choices=('migrate', 'status', 'check'))
+    parser.add_argument('--strict', action='store_true', help="exit non-zero if any hot query scans a table")
+    args = parser.parse_args()
+    logging.basicConfig(format='%(levelname)s %(message)s', level=logging.INFO)
+
+    # Imported here: storage itself imports this module
+    from storage import create_database
+    database = create_database()
+    if not database.connect():
+        return 1
+    try:
+        if args.command == 'migrate':
+            return 0 if database.ensure_schema() else 1
+
+        if args.command == 'status':
+            applied = {row[0]: row for row in database.applied_migrations()}
+            for migration in database.MIGRATIONS:
+                row = applied.get(migration.version)
+                when = row[2] if row else 'pending'
+                print(f"{migration.version:>4}  {migration.name:<24} {when}")
+            return 0
+
+        scans = database.find_full_scans()
+        if scans is None:
+            return 1
+        for name, tables in scans.items():
+            print(f"FULL SCAN  {name}: {', '.join(tables)}")
+        print(f"{len(scans)} of {len(database.hot_queries())} hot queries scan a whole table")
+        return 1 if scans and args.strict else 0
+    finally:
+        database.disconnect()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import os
+import logging
+from telegram.error import TelegramError
+from periodic import run_periodically
+from catalog import DEFAULT_LOCALE, ORDER_STATUSES, ORDER_STATUS_EMOJI, render
+
+logger = logging.getLogger(__name__)
+
+class OrderStatusNotifier:
+    """Tells customers when their orders change, by incremental scanning.
+
+    Each pass reads only the orders whose (updated_at, id) is past the stored
+    watermark, sends a message per change and then moves the watermark
+    forward in the database, so a restart resumes where the last pass ended
+    instead of rescanning the table. The last status announced per order is
+    stored too (order_notifications), so edits that don't touch the status
+    are never re-announced, across restarts and leader changes alike. Each
+    message is rendered in its customer's language.
+    """
+
+    name = 'order_status_notifier'
+
+    def __init__(self, db, interval=None, batch_size=None, lag=None):
+        self.db = db
+        self.interval = interval or float(os.getenv('ORDER_NOTIFY_INTERVAL', '60'))
+        self.batch_size = batch_size or int(os.getenv('ORDER_NOTIFY_BATCH', '500'))
+        self.lag = lag if lag is not None else int(os.getenv('ORDER_NOTIFY_LAG', '5'))
+        self.watermark = None
+        self.sent = 0
+
+    async def run(self, bot):
+        """Poll for changes every ``interval`` seconds until cancelled"""
+        await run_periodically(lambda: self.poll_once(bot), self.interval, "Order status scan")
+
+    async def poll_once(self, bot):
+        if self.watermark is None:
+            watermark = await self.db.get_watermark(self.name)
+            if watermark is False:
+                # Unreadable, not missing: starting over from now would skip
+                # every change since the last pass
+                return
+            if watermark is None:
+                watermark = await self.db.get_initial_watermark(self.lag)
+                if watermark is None:
+                    return
+                await self.db.set_watermark(self.name, *watermark)
+            self.watermark = watermark
+
+        while True:
+            changes = await self.db.get_order_changes(self.watermark, self.batch_size, self.lag)
+            if not changes:
+                return
+            for order in changes:
+                await self.notify(bot, order)
+            await self.db.set_notified_statuses([
+                (order['id'], order['status']) for order in changes if order['status'] != order['notified_status']
+            ])
+            last = changes[-1]
+            self.watermark = (last['updated_at'], last['id'])
+            await self.db.set_watermark(self.name, *self.watermark)
+            if len(changes) < self.batch_size:
+                return
+
+    async def notify(self, bot, order):
+        if order['telegram_id'] is None or order['status'] == order['notified_status']:
+            return
+
+        locale = order['lang'] or DEFAULT_LOCALE
+        text = render(
+            'order_status_update', locale,
+            emoji=ORDER_STATUS_EMOJI.get(order['status'], '❓'),
+            order_number=order['order_number'],
+            status=ORDER_STATUSES.label(order['status'], locale)
+        )
+        try:
+            await bot.send_message(
+                chat_id=order['telegram_id'],
+                text=text,
+                rate_limit_args={'priority': 'bulk'}
+            )
+            self.sent += 1
+        except TelegramError as e:
+            # Blocked bot, deleted account, ... must not stall the scan
+            logger.warning("Could not notify %s about order %s: %s", order['telegram_id'], order['id'], e)
@@ -0,0 +1,82 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from metrics import BCRYPT_SECONDS, BCRYPT_REJECTED
+
+
+class HasherBusy(Exception):
+    """Raised when too many password operations are already queued"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL while it works, so a thread pool gives real
+    parallelism without the cost of a process pool. ``max_concurrency`` caps
+    how many hashes run at once and ``max_queue`` caps how many may wait
+    behind them; anything beyond that is rejected with HasherBusy instead of
+    piling up. Handlers await ``hash_async``/``verify_async``, so waiting for
+    bcrypt never occupies a database worker or blocks the event loop.
+    """
+
+    def __init__(self, rounds=None, max_concurrency=None, max_queue=None):
+        self.rounds = rounds or int(os.getenv('BCRYPT_ROUNDS', '12'))
+        self.max_concurrency = max_concurrency or int(os.getenv('BCRYPT_MAX_CONCURRENCY', '4'))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('BCRYPT_MAX_QUEUE', '32'))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(self.max_concurrency + self.max_queue)
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            BCRYPT_REJECTED.inc()
+            raise HasherBusy("password hashing queue is full")
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password):
+        """Hash a password with the configured cost factor"""
+        return self._submit(self._hash, password, self.rounds).result()
+
+    def hash_many(self, passwords):
+        """Hash a batch of passwords across the pool's threads; results in input order"""
+        futures = [self._submit(self._hash, password, self.rounds) for password in passwords]
+        return [future.result() for future in futures]
+
+    def verify(self, password, password_hash):
+        """Check a password against a stored bcrypt hash"""
+        return self._submit(self._verify, password, password_hash).result()
+
+    async def hash_async(self, password):
+        """hash(), awaited on the event loop instead of blocking a thread"""
+        return await asyncio.wrap_future(self._submit(self._hash, password, self.rounds))
+
+    async def verify_async(self, password, password_hash):
+        """verify(), awaited on the event loop instead of blocking a thread"""
+        return await asyncio.wrap_future(self._submit(self._verify, password, password_hash))
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with fewer rounds than configured"""
+        try:
+            return int(password_hash.split('$')[2]) < self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    @staticmethod
+    def _hash(password, rounds):
+        with BCRYPT_SECONDS.labels('hash').time():
+            return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+    @staticmethod
+    def _verify(password, password_hash):
+        with BCRYPT_SECONDS.labels('verify').time():
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
@@ -0,0 +1,18 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(fn, interval, name):
+    """Await ``fn()`` every ``interval`` seconds until cancelled.
+
+    A failed run is logged under ``name`` and the next one happens on
+    schedule, so one bad pass never stops a background job.
+    """
+    while True:
+        try:
+            await fn()
+        except Exception:
+            logger.exception("%s failed", name)
+        await asyncio.sleep(interval)
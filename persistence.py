@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from telegram.ext import BasePersistence, PersistenceInput
+from cache import TTLCache, MISSING
+
+# user_data keys that must never reach the disk
+SENSITIVE_KEYS = frozenset({'password', 'reset_token', 'login_account'})
+
+
+class SQLitePersistence(BasePersistence):
+    """Stores ConversationHandler states and user_data in a local SQLite file.
+
+    The Application already collects what changed and hands it over once per
+    ``update_interval``; the writes of one such run are coalesced here into a
+    single transaction. Conversation states are small and are loaded at
+    startup, while user_data is loaded lazily the first time a user sends an
+    update after a restart. Keys in SENSITIVE_KEYS (the plain-text password
+    held during registration, the raw password-reset token, the account and
+    password hash read at the login phone step) are stripped before
+    anything is written.
+    """
+
+    def __init__(self, path=None, update_interval=None, max_age=None):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval or float(os.getenv('PERSISTENCE_INTERVAL', '30')),
+        )
+        self.path = path or os.getenv('PERSISTENCE_PATH', 'data/bot_state.sqlite3')
+        # Half-finished conversations older than this are not worth restoring
+        self.max_age = max_age or float(os.getenv('PERSISTENCE_MAX_AGE', str(7 * 24 * 3600)))
+        # A single thread owns the connection, so statements never interleave
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='persistence')
+        self._conn = None
+        # Users whose user_data in memory already holds what is on disk. Bounded:
+        # reloading a forgotten user only fills keys that are missing in memory
+        self._loaded_users = TTLCache(maxsize=int(os.getenv('PERSISTENCE_LOADED_USERS', '10000')), ttl=self.max_age)
+        self._pending_conversations = {}
+        self._pending_users = {}
+        self._flush_task = None
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS conversations (
+                    name TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (name, key)
+                );
+                CREATE TABLE IF NOT EXISTS user_data (
+                    user_id INTEGER PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+            cutoff = time.time() - self.max_age
+            with self._conn:
+                self._conn.execute("DELETE FROM conversations WHERE updated_at < ?", (cutoff,))
+                self._conn.execute("DELETE FROM user_data WHERE updated_at < ?", (cutoff,))
+        return self._conn
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    # Loading
+
+    async def get_conversations(self, name):
+        return await self._run(self._load_conversations, name)
+
+    def _load_conversations(self, name):
+        rows = self._connect().execute("SELECT key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    async def get_user_data(self):
+        # Loaded per user on demand in refresh_user_data
+        return {}
+
+    async def refresh_user_data(self, user_id, user_data):
+        # A write still waiting for its flush is newer than the disk
+        if self._loaded_users.get(user_id) is not MISSING or user_id in self._pending_users:
+            return
+        self._loaded_users.set(user_id, True)
+        stored = await self._run(self._load_user_data, user_id)
+        for key, value in stored.items():
+            user_data.setdefault(key, value)
+
+    def _load_user_data(self, user_id):
+        row = self._connect().execute("SELECT data FROM user_data WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    # Writing
+
+    async def update_conversation(self, name, key, new_state):
+        self._pending_conversations[(name, json.dumps(list(key)))] = new_state
+        self._schedule_flush()
+
+    async def update_user_data(self, user_id, data):
+        self._loaded_users.set(user_id, True)
+        self._pending_users[user_id] = {k: v for k, v in data.items() if k not in SENSITIVE_KEYS}
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id):
+        self._loaded_users.invalidate(user_id)
+        self._pending_users[user_id] = {}
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        # The Application gathers all updates of one run at once; by the time
+        # this task gets to run they have all been buffered.
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_pending())
+
+    async def _flush_pending(self):
+        while self._pending_conversations or self._pending_users:
+            conversations, self._pending_conversations = self._pending_conversations, {}
+            users, self._pending_users = self._pending_users, {}
+            await self._run(self._write, conversations, users)
+
+    def _write(self, conversations, users):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            for (name, key), state in conversations.items():
+                if state is None:
+                    conn.execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, key))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO conversations (name, key, state, updated_at) VALUES (?, ?, ?, ?)",
+                        (name, key, json.dumps(state), now)
+                    )
+            for user_id, data in users.items():
+                if data:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO user_data (user_id, data, updated_at) VALUES (?, ?, ?)",
+                        (user_id, json.dumps(data, ensure_ascii=False), now)
+                    )
+                else:
+                    conn.execute("DELETE FROM user_data WHERE user_id = ?", (user_id,))
+
+    async def flush(self):
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._flush_pending()
+        await self._run(self._close)
+        self.executor.shutdown(wait=True)
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # Unused data kinds
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
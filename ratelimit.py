@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Lanes in the order they are served; pass rate_limit_args={'priority': 'bulk'}
+# on a Bot call to send it in the background lane.
+PRIORITIES = ('interactive', 'bulk')
+
+# Requests that are not messages and don't count against Telegram's limits
+EXEMPT_ENDPOINTS = frozenset({
+    'getMe', 'getUpdates', 'setWebhook', 'deleteWebhook', 'getWebhookInfo',
+    'answerCallbackQuery', 'logOut', 'close',
+})
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def reserve(self, now):
+        """Take a token ahead of time and return how long to wait for it"""
+        wait = self.delay(now)
+        self.tokens -= 1
+        return wait
+
+    def idle(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class PriorityRateLimiter(BaseRateLimiter):
+    """Keeps outgoing Bot API traffic under Telegram's flood limits.
+
+    Every request first takes a token from its chat's bucket (about one
+    message per second in private chats, 20 per minute in groups), then
+    waits for a global token (about 30 per second). Global tokens are
+    handed out by a single pump that always serves the interactive lane
+    before the bulk lane, so replies to users overtake notifications and
+    broadcasts. A RetryAfter from Telegram pauses the whole pump for the
+    requested time, and the request is retried.
+    """
+
+    def __init__(self, global_rate=None, chat_rate=None, chat_burst=None, group_per_minute=None, max_retries=None):
+        self.global_rate = global_rate or float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+        self.chat_rate = chat_rate or float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+        self.chat_burst = chat_burst or float(os.getenv('TELEGRAM_CHAT_BURST', '3'))
+        self.group_rate = (group_per_minute or float(os.getenv('TELEGRAM_GROUP_PER_MINUTE', '20'))) / 60
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('TELEGRAM_MAX_RETRIES', '3'))
+        self._global = TokenBucket(self.global_rate, self.global_rate, time.monotonic())
+        self._chats = {}
+        self._lanes = {priority: deque() for priority in PRIORITIES}
+        self._wakeup = asyncio.Event()
+        self._paused_until = 0.0
+        self._pump_task = None
+        self._sent_times = deque()
+        self.sent = 0
+        self.throttled = 0
+        self.retry_after = 0
+
+    async def initialize(self):
+        if self._pump_task is None:
+            self._pump_task = asyncio.create_task(self._pump())
+
+    async def shutdown(self):
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            self._pump_task = None
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint in EXEMPT_ENDPOINTS:
+            return await callback(*args, **kwargs)
+
+        priority = (rate_limit_args or {}).get('priority', 'interactive')
+        if priority not in self._lanes:
+            priority = 'interactive'
+        chat_id = data.get('chat_id')
+
+        for attempt in range(self.max_retries + 1):
+            if chat_id is not None:
+                wait = self._chat_bucket(chat_id).reserve(time.monotonic())
+                if wait > 0:
+                    self.throttled += 1
+                    await asyncio.sleep(wait)
+            await self._acquire(priority)
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self.retry_after += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                logger.warning("Hit Telegram flood control on %s, pausing sends for %ss", endpoint, e.retry_after)
+                if attempt == self.max_retries:
+                    raise
+                continue
+            self._record_sent()
+            return result
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            now = time.monotonic()
+            if len(self._chats) >= 10000:
+                # Drop buckets of chats that have been quiet long enough to be full again
+                self._chats = {key: b for key, b in self._chats.items() if not b.idle(now)}
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = TokenBucket(self.group_rate, self.group_rate * 60, now)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def _acquire(self, priority):
+        if self._pump_task is None:
+            await self.initialize()
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[priority].append(future)
+        self._wakeup.set()
+        await future
+
+    async def _pump(self):
+        while True:
+            lane = next((lane for lane in self._lanes.values() if lane), None)
+            if lane is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            wait = self._global.delay(now)
+            if wait > 0:
+                self.throttled += 1
+                await asyncio.sleep(wait)
+                # Re-pick the lane: an interactive request may have arrived meanwhile
+                continue
+
+            future = lane.popleft()
+            if future.done():
+                # The caller was cancelled while queued
+                continue
+            self._global.take(now)
+            future.set_result(None)
+
+    def _record_sent(self):
+        now = time.monotonic()
+        self.sent += 1
+        self._sent_times.append(now)
+        while self._sent_times and self._sent_times[0] < now - 10:
+            self._sent_times.popleft()
+
+    def stats(self):
+        now = time.monotonic()
+        while self._sent_times and self._sent_times[0] < now - 10:
+            self._sent_times.popleft()
+        return {
+            'queued': {priority: len(lane) for priority, lane in self._lanes.items()},
+            'sent': self.sent,
+            'send_rate': len(self._sent_times) / 10,
+            'throttled': self.throttled,
+            'retry_after': self.retry_after,
+            'paused_for': max(0.0, self._paused_until - now),
+            'tracked_chats': len(self._chats),
+        }
@@ -0,0 +1,376 @@
+import os
+import sqlite3
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from storage import Storage, ExecResult
+from migrations import Migration, Column, LOOKUP_INDEXES
+
+logger = logging.getLogger(__name__)
+
+# Timestamps are stored as local-time text with microseconds. One fixed
+# width keeps text order equal to time order, which the (timestamp, id)
+# watermark and keyset queries rely on.
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' ', 'microseconds'))
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_converter('DATETIME', _parse_timestamp)
+# Money is summed as Decimal; NUMERIC columns take it back as a number
+sqlite3.register_adapter(Decimal, str)
+
+NOW = "(strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime') || '000')"
+
+
+def _seconds_ago(placeholder):
+    return f"(strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime', '-' || {placeholder} || ' seconds') || '000')"
+
+
+def _seconds_from_now(placeholder):
+    return f"(strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime', '+' || {placeholder} || ' seconds') || '000')"
+
+
+# The whole schema, since an embedded database has no separate provisioning.
+# Never edit an applied migration; append a new one.
+MIGRATIONS = [
+    Migration(1, 'core_tables', [
+        f"""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER,
+            full_name TEXT NOT NULL,
+            phone TEXT NOT NULL UNIQUE,
+            email TEXT,
+            business_name TEXT,
+            business_address TEXT,
+            governorate TEXT,
+            annual_revenue TEXT,
+            business_type TEXT,
+            password_hash TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'active',
+            created_at DATETIME NOT NULL DEFAULT {NOW},
+            updated_at DATETIME NOT NULL DEFAULT {NOW}
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            order_number TEXT NOT NULL UNIQUE,
+            status TEXT NOT NULL DEFAULT 'pending',
+            total_amount NUMERIC NOT NULL DEFAULT 0,
+            created_at DATETIME NOT NULL DEFAULT {NOW},
+            updated_at DATETIME NOT NULL DEFAULT {NOW}
+        )
+        """,
+        # Stand-in for MySQL's ON UPDATE CURRENT_TIMESTAMP, which the order scan depends on
+        f"""
+        CREATE TRIGGER IF NOT EXISTS orders_touch_updated_at AFTER UPDATE ON orders
+        WHEN NEW.updated_at = OLD.updated_at
+        BEGIN
+            UPDATE orders SET updated_at = {NOW} WHERE id = NEW.id;
+        END
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS password_reset_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            token TEXT NOT NULL,
+            expires_at DATETIME NOT NULL,
+            used BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at DATETIME NOT NULL DEFAULT {NOW}
+        )
+        """,
+    ]),
+    Migration(2, 'bot_tables', [
+        f"""
+        CREATE TABLE IF NOT EXISTS bot_watermarks (
+            name TEXT PRIMARY KEY,
+            last_ts DATETIME NOT NULL,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME NOT NULL DEFAULT {NOW}
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_telegram_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            last_user_id INTEGER NOT NULL DEFAULT 0,
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME NOT NULL DEFAULT {NOW},
+            updated_at DATETIME NOT NULL DEFAULT {NOW}
+        )
+        """,
+    ]),
+    Migration(3, 'lookup_indexes', LOOKUP_INDEXES),
+    Migration(4, 'leases', [
+        f"""
+        CREATE TABLE IF NOT EXISTS bot_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at DATETIME NOT NULL,
+            updated_at DATETIME NOT NULL DEFAULT {NOW}
+        )
+        """,
+    ]),
+    Migration(5, 'order_summary', [
+        """
+        CREATE TABLE IF NOT EXISTS user_order_summary (
+            user_id INTEGER PRIMARY KEY,
+            pending_orders INTEGER NOT NULL DEFAULT 0,
+            confirmed_orders INTEGER NOT NULL DEFAULT 0,
+            shipped_orders INTEGER NOT NULL DEFAULT 0,
+            delivered_orders INTEGER NOT NULL DEFAULT 0,
+            cancelled_orders INTEGER NOT NULL DEFAULT 0,
+            total_amount NUMERIC NOT NULL DEFAULT 0,
+            month TEXT,
+            month_amount NUMERIC NOT NULL DEFAULT 0,
+            last_order_at DATETIME
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS order_summary_snapshots (
+            order_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            total_amount NUMERIC NOT NULL,
+            created_at DATETIME NOT NULL
+        )
+        """,
+    ]),
+    Migration(6, 'languages', [
+        Column('users', 'lang', 'TEXT'),
+        Column('broadcasts', 'locale', 'TEXT'),
+    ]),
+    Migration(7, 'order_notifications', [
+        """
+        CREATE TABLE IF NOT EXISTS order_notifications (
+            order_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL
+        )
+        """,
+        # Existing orders were announced by the in-memory notifier already
+        "INSERT OR IGNORE INTO order_notifications (order_id, status) SELECT id, status FROM orders",
+    ]),
+]
+
+# SQLite spellings of the statements that differ between backends
+SET_WATERMARK = f"""
+    INSERT INTO bot_watermarks (name, last_ts, last_id) VALUES (%s, %s, %s)
+    ON CONFLICT (name) DO UPDATE SET last_ts = excluded.last_ts, last_id = excluded.last_id, updated_at = {NOW}
+"""
+# BEGIN IMMEDIATE already holds the write lock, so a plain read is enough
+LOCK_WATERMARK = "SELECT last_ts, last_id FROM bot_watermarks WHERE name = %s"
+INITIAL_WATERMARK = f'SELECT {_seconds_ago("%s")} AS "ts [DATETIME]"'
+ORDER_CHANGES = f"""
+    SELECT o.id, o.order_number, o.status, o.total_amount, o.user_id, o.created_at, o.updated_at, u.telegram_id, u.lang,
+           n.status AS notified_status
+    FROM orders o
+    JOIN users u ON u.id = o.user_id
+    LEFT JOIN order_notifications n ON n.order_id = o.id
+    WHERE (o.updated_at > %s OR (o.updated_at = %s AND o.id > %s))
+      AND o.updated_at < {_seconds_ago("%s")}
+    ORDER BY o.updated_at, o.id
+    LIMIT %s
+"""
+SET_NOTIFIED_STATUS = """
+    INSERT INTO order_notifications (order_id, status) VALUES (%s, %s)
+    ON CONFLICT (order_id) DO UPDATE SET status = excluded.status
+"""
+VERIFY_RESET_TOKEN = f"""
+    SELECT user_id FROM password_reset_tokens
+    WHERE token = %s AND expires_at > {NOW} AND used = FALSE
+"""
+CONSUME_RESET_TOKEN = f"""
+    UPDATE password_reset_tokens SET used = TRUE
+    WHERE token = %s AND user_id = %s AND used = FALSE AND expires_at > {NOW}
+"""
+# sqlite3 is usually built without DELETE ... LIMIT
+SWEEP_RESET_TOKENS = f"""
+    DELETE FROM password_reset_tokens WHERE id IN (
+        SELECT id FROM password_reset_tokens WHERE used = TRUE OR expires_at < {NOW} LIMIT %s
+    )
+"""
+RENEW_LEASE = f"""
+    UPDATE bot_leases SET holder = %s, expires_at = {_seconds_from_now("%s")}, updated_at = {NOW}
+    WHERE name = %s AND (holder = %s OR expires_at < {NOW})
+"""
+INSERT_LEASE = f"INSERT OR IGNORE INTO bot_leases (name, holder, expires_at) VALUES (%s, %s, {_seconds_from_now('%s')})"
+
+
+@functools.lru_cache(maxsize=256)
+def _qmark(query):
+    """Rewrite the shared %s placeholders into sqlite3's ? style"""
+    return query.replace('%s', '?')
+
+
+class SQLiteDatabase(Storage):
+    """Embedded SQLite storage backend for single-node deployments, tests and benchmarks.
+
+    Each worker thread keeps its own connection to the database file. WAL
+    mode lets readers run alongside the single writer, and the busy timeout
+    makes writers queue for the lock instead of failing. There is no network
+    hop, so an indexed lookup takes microseconds.
+    """
+
+    errors = (sqlite3.Error,)
+    MIGRATIONS = MIGRATIONS
+    SET_WATERMARK = SET_WATERMARK
+    LOCK_WATERMARK = LOCK_WATERMARK
+    INITIAL_WATERMARK = INITIAL_WATERMARK
+    ORDER_CHANGES = ORDER_CHANGES
+    SET_NOTIFIED_STATUS = SET_NOTIFIED_STATUS
+    VERIFY_RESET_TOKEN = VERIFY_RESET_TOKEN
+    CONSUME_RESET_TOKEN = CONSUME_RESET_TOKEN
+    SWEEP_RESET_TOKENS = SWEEP_RESET_TOKENS
+    RENEW_LEASE = RENEW_LEASE
+    INSERT_LEASE = INSERT_LEASE
+
+    def __init__(self, path=None, hasher=None):
+        super().__init__(hasher)
+        self.path = path or os.getenv('SQLITE_PATH', 'data/superstar.sqlite3')
+        self.busy_timeout = float(os.getenv('SQLITE_BUSY_TIMEOUT', '5'))
+        self.concurrency = int(os.getenv('SQLITE_MAX_CONNECTIONS', '4'))
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _open_connection(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            # Single statements commit on their own; transaction() opens explicit ones
+            isolation_level=None,
+            # Owned by one worker thread; only disconnect() touches it from elsewhere
+            check_same_thread=False,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def _thread_connection(self):
+        connection = getattr(self._local, 'sqlite', None)
+        if connection is None:
+            connection = self._local.sqlite = self._open_connection()
+        return connection
+
+    def connect(self):
+        try:
+            self._thread_connection()
+            return True
+        except sqlite3.Error as e:
+            logger.error("Error opening database %s: %s", self.path, e)
+            return False
+
+    def disconnect(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+    def pool_stats(self):
+        with self._connections_lock:
+            return {'connections': len(self._connections), 'max_size': self.concurrency}
+
+    @contextmanager
+    def transaction(self):
+        """Run every query inside the block on this thread's connection, committed together.
+
+        Nested blocks join the outer transaction. The write lock is taken up
+        front (BEGIN IMMEDIATE) so two transactions never deadlock upgrading
+        from read to write.
+        """
+        if getattr(self._local, 'connection', None) is not None:
+            yield self._local.connection
+            return
+
+        connection = self._thread_connection()
+        connection.execute("BEGIN IMMEDIATE")
+        self._local.connection = connection
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            try:
+                connection.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            raise
+        finally:
+            self._local.connection = None
+
+    # Typed query API. sqlite3 caches compiled statements per connection.
+
+    def fetch_all(self, query, params=None, dictionary=False):
+        cursor = self._thread_connection().execute(_qmark(query), params or ())
+        try:
+            rows = cursor.fetchall()
+            if dictionary:
+                columns = [column[0] for column in cursor.description]
+                rows = [dict(zip(columns, row)) for row in rows]
+            return rows
+        finally:
+            cursor.close()
+
+    def iter_rows(self, query, params=None, dictionary=False, chunk_size=1000):
+        cursor = self._thread_connection().execute(_qmark(query), params or ())
+        try:
+            columns = [column[0] for column in cursor.description] if dictionary else None
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if dictionary:
+                    rows = [dict(zip(columns, row)) for row in rows]
+                yield from rows
+        finally:
+            cursor.close()
+
+    def execute(self, query, params=None):
+        cursor = self._thread_connection().execute(_qmark(query), params or ())
+        try:
+            return ExecResult(cursor.rowcount, cursor.lastrowid)
+        finally:
+            cursor.close()
+
+    def execute_many(self, query, seq_params):
+        with self.transaction() as connection:
+            cursor = connection.executemany(_qmark(query), seq_params)
+            try:
+                return cursor.rowcount
+            finally:
+                cursor.close()
+
+    def index_columns(self, table):
+        # PRAGMAs take no parameters; table names only ever come from our own Index specs
+        indexes = {}
+        for _, name, unique, *_ in self.fetch_all(f"PRAGMA index_list({table})"):
+            columns = tuple(row[2] for row in self.fetch_all(f"PRAGMA index_info({name})"))
+            indexes[name] = (columns, bool(unique))
+        return indexes
+
+    def table_columns(self, table):
+        return {row[1] for row in self.fetch_all(f"PRAGMA table_info({table})")}
+
+    def full_scans(self, query, params=None):
+        # "SCAN t" reads the table; "SCAN t USING INDEX" and "SEARCH t ..." use an index
+        plan = self.fetch_all("EXPLAIN QUERY PLAN " + query, params)
+        return [
+            detail for *_, detail in plan
+            if detail.startswith('SCAN ') and ' USING ' not in detail and detail != 'SCAN CONSTANT ROW'
+        ]
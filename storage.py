@@ -0,0 +1,775 @@
+import os
+import time
+import asyncio
+import logging
+import functools
+import contextvars
+import threading
+import secrets
+import hashlib
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from passwords import PasswordHasher
+from cache import TTLCache, MISSING
+from metrics import DB_SECONDS, DB_WAIT_SECONDS, DB_ERRORS
+from migrations import Index, Column, SCHEMA_MIGRATIONS_TABLE, APPLIED_MIGRATIONS, MIGRATION_APPLIED, RECORD_MIGRATION
+
+logger = logging.getLogger(__name__)
+
+# Hot statements shared by every backend. They are sent as plain text each
+# time; hot_queries() lists them so find_full_scans can check their plans.
+USER_BY_PHONE = "SELECT id, telegram_id, full_name FROM users WHERE phone = %s"
+USER_BY_TELEGRAM_ID = "SELECT id, phone, full_name, lang FROM users WHERE telegram_id = %s"
+LOGIN_ACCOUNT = "SELECT id, full_name, status, lang, password_hash FROM users WHERE phone = %s"
+UPDATE_TELEGRAM_ID = "UPDATE users SET telegram_id = %s WHERE phone = %s"
+# A NULL hash or language leaves the stored one as it is
+BIND_TELEGRAM_ID = """
+    UPDATE users SET telegram_id = %s, password_hash = COALESCE(%s, password_hash), lang = COALESCE(%s, lang)
+    WHERE id = %s
+"""
+SET_LANGUAGE = "UPDATE users SET lang = %s WHERE telegram_id = %s"
+ORDERS_FIRST_PAGE = """
+    SELECT o.id, o.order_number, o.status, o.total_amount, o.created_at
+    FROM orders o
+    WHERE o.user_id = %s
+    ORDER BY o.created_at DESC, o.id DESC
+    LIMIT %s
+"""
+ORDERS_PAGE_OLDER = """
+    SELECT o.id, o.order_number, o.status, o.total_amount, o.created_at
+    FROM orders o
+    WHERE o.user_id = %s AND (o.created_at < %s OR (o.created_at = %s AND o.id < %s))
+    ORDER BY o.created_at DESC, o.id DESC
+    LIMIT %s
+"""
+ORDERS_PAGE_NEWER = """
+    SELECT o.id, o.order_number, o.status, o.total_amount, o.created_at
+    FROM orders o
+    WHERE o.user_id = %s AND (o.created_at > %s OR (o.created_at = %s AND o.id > %s))
+    ORDER BY o.created_at ASC, o.id ASC
+    LIMIT %s
+"""
+# Newest linked accounts first, by primary key; loaded into the user cache at startup
+RECENT_LINKED_USERS = """
+    SELECT telegram_id, id, phone, full_name, lang FROM users
+    WHERE telegram_id IS NOT NULL
+    ORDER BY id DESC
+    LIMIT %s
+"""
+# Columns of a user row as written by create_user and the bulk import
+USER_COLUMNS = (
+    'telegram_id', 'full_name', 'phone', 'email', 'business_name',
+    'business_address', 'governorate', 'annual_revenue', 'business_type', 'password_hash', 'lang'
+)
+INSERT_USER = f"INSERT INTO users ({', '.join(USER_COLUMNS)}) VALUES ({', '.join(['%s'] * len(USER_COLUMNS))})"
+# Everything but the password hash, in primary-key order
+EXPORT_USERS = """
+    SELECT id, telegram_id, full_name, phone, email, business_name, business_address,
+           governorate, annual_revenue, business_type, status, created_at
+    FROM users ORDER BY id
+"""
+BROADCAST_RECIPIENTS = """
+    SELECT id, telegram_id FROM users
+    WHERE id > %s AND telegram_id IS NOT NULL
+    ORDER BY id
+    LIMIT %s
+"""
+
+# Per-user order counters, one row per user, kept current by
+# refresh_order_summary. Every order's last folded-in state is kept in
+# order_summary_snapshots, so a change is applied as (new - old).
+SUMMARY_STATUSES = ('pending', 'confirmed', 'shipped', 'delivered', 'cancelled')
+SUMMARY_COLUMNS = tuple(f'{status}_orders' for status in SUMMARY_STATUSES) + (
+    'total_amount', 'month', 'month_amount', 'last_order_at'
+)
+ORDER_SUMMARY_BY_USER = f"SELECT user_id, {', '.join(SUMMARY_COLUMNS)} FROM user_order_summary WHERE user_id = %s"
+INSERT_ORDER_SUMMARY = f"""
+    INSERT INTO user_order_summary ({', '.join(SUMMARY_COLUMNS)}, user_id)
+    VALUES ({', '.join(['%s'] * (len(SUMMARY_COLUMNS) + 1))})
+"""
+UPDATE_ORDER_SUMMARY = f"""
+    UPDATE user_order_summary SET {', '.join(f'{column} = %s' for column in SUMMARY_COLUMNS)}
+    WHERE user_id = %s
+"""
+INSERT_ORDER_SNAPSHOT = """
+    INSERT INTO order_summary_snapshots (user_id, status, total_amount, created_at, order_id)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+UPDATE_ORDER_SNAPSHOT = """
+    UPDATE order_summary_snapshots SET user_id = %s, status = %s, total_amount = %s, created_at = %s
+    WHERE order_id = %s
+"""
+ORDER_SUMMARY_WATERMARK = 'order_summary'
+# Where a fresh summary starts: the first order ever, folded in batch by batch
+ORDER_SUMMARY_EPOCH = (datetime(1970, 1, 1), 0)
+
+
+ExecResult = namedtuple('ExecResult', ['rowcount', 'lastrowid'])
+
+
+def hash_reset_token(token):
+    """Reset tokens are stored as SHA-256 digests, so a leaked table holds no usable token"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _amount(value):
+    # MySQL returns Decimal, SQLite int or float
+    return Decimal(str(value)) if value is not None else Decimal(0)
+
+
+def _month(moment):
+    return moment.strftime('%Y-%m')
+
+
+def _summary(user_id, row=None, month=None):
+    """A mutable summary for ``user_id``, from its stored row if there is one"""
+    summary = {'user_id': user_id, 'month': month, 'last_order_at': None}
+    summary.update({column: 0 for column in SUMMARY_COLUMNS[:len(SUMMARY_STATUSES)]})
+    summary['total_amount'] = summary['month_amount'] = Decimal(0)
+    if row:
+        summary.update(row)
+        summary['total_amount'] = _amount(row['total_amount'])
+        summary['month_amount'] = _amount(row['month_amount'])
+    if summary['month'] != month:
+        # The stored month has ended: this month's spending starts from zero
+        summary['month'], summary['month_amount'] = month, Decimal(0)
+    return summary
+
+
+def _fold_order(summary, order, sign):
+    """Add (sign=1) or remove (sign=-1) one order's state in ``summary``"""
+    column = f"{order['status']}_orders"
+    if column in summary:
+        summary[column] += sign
+    if order['status'] != 'cancelled':
+        amount = sign * _amount(order['total_amount'])
+        summary['total_amount'] += amount
+        if _month(order['created_at']) == summary['month']:
+            summary['month_amount'] += amount
+    if sign > 0 and (summary['last_order_at'] is None or order['created_at'] > summary['last_order_at']):
+        summary['last_order_at'] = order['created_at']
+
+
+def _summary_params(summary):
+    return tuple(summary[column] for column in SUMMARY_COLUMNS) + (summary['user_id'],)
+
+
+def _snapshot_params(order):
+    return (order['user_id'], order['status'], _amount(order['total_amount']), order['created_at'], order['id'])
+
+
+def _report_errors(default=None):
+    """Log the backend's database errors and return ``default``, the contract handlers rely on"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except self.errors as e:
+                DB_ERRORS.labels(method.__name__).inc()
+                logger.error("Database error in %s: %s", method.__name__, e)
+                return default
+        return wrapper
+    return decorator
+
+
+class Storage(ABC):
+    """Users, orders, reset tokens and the bot's bookkeeping, over any SQL backend.
+
+    The domain methods live here and are written against a small typed query
+    API (fetch_all, iter_rows, execute, execute_many, transaction) with
+    ``%s`` placeholders. Backends implement that API plus the handful of
+    statements whose SQL differs between engines.
+    """
+
+    # Database errors of the backend's driver, caught by the domain methods
+    errors = ()
+    # Connections the backend can use at once; sizes AsyncDatabase's workers
+    concurrency = 1
+
+    # Versioned schema (migrations.Migration list) and engine-specific
+    # statements, provided by each backend
+    MIGRATIONS = ()
+    SET_WATERMARK = None
+    LOCK_WATERMARK = None
+    INITIAL_WATERMARK = None
+    ORDER_CHANGES = None
+    SET_NOTIFIED_STATUS = None
+    VERIFY_RESET_TOKEN = None
+    CONSUME_RESET_TOKEN = None
+    SWEEP_RESET_TOKENS = None
+    RENEW_LEASE = None
+    INSERT_LEASE = None
+
+    def __init__(self, hasher=None):
+        self.hasher = hasher or PasswordHasher()
+        # Connection of the transaction open on the current thread, if any
+        self._local = threading.local()
+        self.user_cache = TTLCache(
+            maxsize=int(os.getenv('USER_CACHE_SIZE', '10000')),
+            ttl=float(os.getenv('USER_CACHE_TTL', '300')),
+            negative_ttl=float(os.getenv('USER_CACHE_NEGATIVE_TTL', '60')),
+        )
+
+    @abstractmethod
+    def connect(self):
+        """Open the backend's connections ahead of the first query; False on failure"""
+
+    @abstractmethod
+    def disconnect(self):
+        """Close the backend's connections"""
+
+    @abstractmethod
+    def transaction(self):
+        """Context manager running every query inside the block as one transaction"""
+
+    # Typed query API. These raise the backend's errors; the domain methods
+    # below catch them so handlers keep getting None/False on failure.
+
+    def fetch_one(self, query, params=None, dictionary=False):
+        """Run a query and return its first row (tuple or dict), or None"""
+        rows = self.fetch_all(query, params, dictionary)
+        return rows[0] if rows else None
+
+    @abstractmethod
+    def fetch_all(self, query, params=None, dictionary=False):
+        """Run a query and return all rows as tuples (or dicts)"""
+
+    @abstractmethod
+    def iter_rows(self, query, params=None, dictionary=False, chunk_size=1000):
+        """Stream a query's rows, ``chunk_size`` at a time"""
+
+    @abstractmethod
+    def execute(self, query, params=None):
+        """Run a write statement; returns (rowcount, lastrowid)"""
+
+    @abstractmethod
+    def execute_many(self, query, seq_params):
+        """Run one statement for many parameter rows in a single transaction"""
+
+    @abstractmethod
+    def index_columns(self, table):
+        """{index name: (column tuple, unique)} for every index on ``table``"""
+
+    @abstractmethod
+    def table_columns(self, table):
+        """Names of every column of ``table``"""
+
+    @abstractmethod
+    def full_scans(self, query, params=None):
+        """EXPLAIN ``query`` and return the tables it would read in full"""
+
+    def pool_stats(self):
+        """Connection counters of the backend, for health reports"""
+        return {}
+
+    def open_connections(self):
+        """Open the connections traffic will need; called by warm_up"""
+        if not self.connect():
+            raise ConnectionError("could not connect to the database")
+
+    @_report_errors(default=False)
+    def ping(self):
+        """One round trip to the database"""
+        self.fetch_one("SELECT 1")
+        return True
+
+    @_report_errors()
+    def warm_up(self, cached_users=None):
+        """Open connections and fill the user cache before the first user arrives"""
+        started = time.perf_counter()
+        if cached_users is None:
+            cached_users = int(os.getenv('USER_CACHE_WARM', '1000'))
+        self.open_connections()
+        generation = self.user_cache.generation
+        loaded = 0
+        for user in self.iter_rows(RECENT_LINKED_USERS, (min(cached_users, self.user_cache.maxsize),), dictionary=True):
+            self.user_cache.set(user.pop('telegram_id'), user, generation)
+            loaded += 1
+        return {'cached_users': loaded, 'seconds': round(time.perf_counter() - started, 3), **self.pool_stats()}
+
+    @_report_errors(default=False)
+    def ensure_schema(self):
+        """Apply the backend's pending migrations in order; cheap to run on every start"""
+        self.execute(SCHEMA_MIGRATIONS_TABLE)
+        applied = {row[0] for row in self.fetch_all(APPLIED_MIGRATIONS)}
+        for migration in self.MIGRATIONS:
+            if migration.version in applied:
+                continue
+            logger.info("Applying schema migration %d (%s)", migration.version, migration.name)
+            for step in migration.steps:
+                if isinstance(step, Index):
+                    self.ensure_index(step)
+                elif isinstance(step, Column):
+                    self.ensure_column(step)
+                else:
+                    self.execute(step)
+            # Another instance may have raced us through the same (idempotent) steps
+            if self.fetch_one(MIGRATION_APPLIED, (migration.version,)) is None:
+                self.execute(RECORD_MIGRATION, (migration.version, migration.name, datetime.now()))
+        return True
+
+    def applied_migrations(self):
+        """(version, name, applied_at) of every recorded migration"""
+        self.execute(SCHEMA_MIGRATIONS_TABLE)
+        return self.fetch_all(APPLIED_MIGRATIONS)
+
+    def ensure_column(self, column):
+        """Add ``column`` unless its table already has it; True if it was added"""
+        if column.name in self.table_columns(column.table):
+            return False
+        logger.info("Adding column %s.%s", column.table, column.name)
+        self.execute(column.add_statement())
+        return True
+
+    def ensure_index(self, index):
+        """Create ``index`` unless an existing one already covers it; True if it was created"""
+        for columns, unique in self.index_columns(index.table).values():
+            if index.covered_by(columns, unique):
+                return False
+        logger.info("Creating index %s on %s", index.name, index.table)
+        self.execute(index.create_statement())
+        return True
+
+    def hot_queries(self):
+        """(name, query, sample params) of every statement on a request or job hot path"""
+        now = datetime.now()
+        token = hash_reset_token('')
+        return [
+            ('user_by_phone', USER_BY_PHONE, ('07700000000',)),
+            ('user_by_telegram_id', USER_BY_TELEGRAM_ID, (0,)),
+            ('login_account', LOGIN_ACCOUNT, ('07700000000',)),
+            ('update_telegram_id', UPDATE_TELEGRAM_ID, (None, '07700000000')),
+            ('bind_telegram_id', BIND_TELEGRAM_ID, (0, None, None, 0)),
+            ('set_language', SET_LANGUAGE, (None, 0)),
+            ('orders_first_page', ORDERS_FIRST_PAGE, (0, 6)),
+            ('orders_page_older', ORDERS_PAGE_OLDER, (0, now, now, 0, 6)),
+            ('orders_page_newer', ORDERS_PAGE_NEWER, (0, now, now, 0, 6)),
+            ('broadcast_recipients', BROADCAST_RECIPIENTS, (0, 100)),
+            ('order_changes', self.ORDER_CHANGES, (now, now, 0, 5, 500)),
+            ('order_summary', ORDER_SUMMARY_BY_USER, (0,)),
+            ('verify_reset_token', self.VERIFY_RESET_TOKEN, (token,)),
+            ('consume_reset_token', self.CONSUME_RESET_TOKEN, (token, 0)),
+        ]
+
+    @_report_errors()
+    def find_full_scans(self):
+        """{query name: [tables]} for the hot queries that would read a whole table"""
+        scans = {}
+        for name, query, params in self.hot_queries():
+            tables = self.full_scans(query, params)
+            if tables:
+                scans[name] = tables
+        return scans
+
+    @_report_errors()
+    def user_exists_by_phone(self, phone):
+        """Check if user exists by phone number"""
+        return self.fetch_one(USER_BY_PHONE, (phone,), dictionary=True)
+
+    @_report_errors()
+    def user_exists_by_telegram_id(self, telegram_id):
+        """Check if user exists by Telegram ID (served from the user cache when possible)"""
+        cached = self.user_cache.get(telegram_id)
+        if cached is not MISSING:
+            return cached
+
+        generation = self.user_cache.generation
+        # A failed query raises here, so errors are never cached as "no such user"
+        user = self.fetch_one(USER_BY_TELEGRAM_ID, (telegram_id,), dictionary=True)
+        self.user_cache.set(telegram_id, user, generation)
+        return user
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters of the telegram_id user cache"""
+        return self.user_cache.stats()
+
+    @_report_errors()
+    def create_user(self, user_data):
+        """Create new user account; the caller hashes the password into ``user_data['password_hash']``"""
+        result = self.execute(INSERT_USER, tuple(user_data[column] for column in USER_COLUMNS))
+        # Drop a cached "unknown user" for this Telegram account
+        self.user_cache.invalidate(user_data['telegram_id'])
+        return result.lastrowid
+
+    @_report_errors()
+    def existing_phones(self, phones):
+        """The subset of ``phones`` that already belong to an account"""
+        if not phones:
+            return set()
+        placeholders = ', '.join(['%s'] * len(phones))
+        return {row[0] for row in self.fetch_all(f"SELECT phone FROM users WHERE phone IN ({placeholders})", list(phones))}
+
+    def insert_users(self, users):
+        """Insert ready-made user rows (``USER_COLUMNS`` dicts) as one multi-row batch.
+
+        The batch is a single transaction. If it fails, say because another
+        writer took one of the phones meanwhile, the rows are inserted one
+        at a time so only the offending ones are rejected. Returns
+        {position in ``users``: error message} for the rows not inserted.
+        """
+        rows = [tuple(user[column] for column in USER_COLUMNS) for user in users]
+        try:
+            self.execute_many(INSERT_USER, rows)
+            return {}
+        except self.errors as e:
+            logger.warning("Batch of %d users failed (%s); inserting them one by one", len(rows), e)
+        
+        failed = {}
+        for position, row in enumerate(rows):
+            try:
+                self.execute(INSERT_USER, row)
+            except self.errors as e:
+                DB_ERRORS.labels('insert_users').inc()
+                failed[position] = str(e)
+        return failed
+
+    def iter_users(self, chunk_size=1000):
+        """Stream every account (without its password hash) as dicts, in id order"""
+        return self.iter_rows(EXPORT_USERS, dictionary=True, chunk_size=chunk_size)
+
+    @_report_errors()
+    def get_login_account(self, phone):
+        """id, full_name, status, lang and password_hash of the account with ``phone``, or None.
+
+        The caller checks the password itself, off the database workers.
+        """
+        return self.fetch_one(LOGIN_ACCOUNT, (phone,), dictionary=True)
+
+    @_report_errors(default=False)
+    def set_language(self, telegram_id, locale):
+        """Keep the language choice on the account linked to ``telegram_id``, if any"""
+        self.execute(SET_LANGUAGE, (locale, telegram_id))
+        self.user_cache.invalidate(telegram_id)
+        return True
+
+    @_report_errors(default=False)
+    def bind_telegram_id(self, user_id, telegram_id, password_hash=None, lang=None):
+        """Bind a verified login's Telegram account in one UPDATE.
+
+        An upgraded ``password_hash`` and the chosen ``lang`` go into the same
+        statement when given.
+        """
+        self.execute(BIND_TELEGRAM_ID, (telegram_id, password_hash, lang, user_id))
+        self.user_cache.invalidate_if(lambda cached: cached is not None and cached['id'] == user_id)
+        self.user_cache.invalidate(telegram_id)
+        return True
+
+    @_report_errors()
+    def update_telegram_id(self, phone, telegram_id):
+        """Update user's Telegram ID after successful login"""
+        self.execute(UPDATE_TELEGRAM_ID, (telegram_id, phone))
+        # Forget both the account's previous binding and any cached miss for the new one
+        self.user_cache.invalidate_if(lambda user: user is not None and user['phone'] == phone)
+        if telegram_id is not None:
+            self.user_cache.invalidate(telegram_id)
+        return True
+
+    @_report_errors()
+    def get_user_orders_page(self, user_id, limit=5, before=None, after=None):
+        """Get one page of a user's orders, newest first, by keyset pagination.
+
+        ``before``/``after`` are (created_at, id) cursors taken from the last
+        or first row of the current page. Each page is a range scan on the
+        (user_id, created_at) index; no OFFSET is involved. Returns a dict with
+        the rows and whether older/newer pages exist, or None on error.
+        """
+        if after is not None:
+            # Walk towards newer orders, then flip the rows back to newest-first
+            params = (user_id, after[0], after[0], after[1], limit + 1)
+            rows = self.fetch_all(ORDERS_PAGE_NEWER, params, dictionary=True)
+            return {'orders': rows[:limit][::-1], 'has_newer': len(rows) > limit, 'has_older': True}
+
+        if before is not None:
+            params = (user_id, before[0], before[0], before[1], limit + 1)
+            rows = self.fetch_all(ORDERS_PAGE_OLDER, params, dictionary=True)
+        else:
+            rows = self.fetch_all(ORDERS_FIRST_PAGE, (user_id, limit + 1), dictionary=True)
+        return {'orders': rows[:limit], 'has_newer': before is not None, 'has_older': len(rows) > limit}
+
+    @_report_errors(default=False)
+    def get_watermark(self, name):
+        """Get the (timestamp, id) position a background scan has reached.
+
+        None means the scan has never recorded one; False means the database
+        could not be read, which must not be mistaken for a fresh start.
+        """
+        return self.fetch_one("SELECT last_ts, last_id FROM bot_watermarks WHERE name = %s", (name,))
+
+    @_report_errors()
+    def set_watermark(self, name, last_ts, last_id):
+        """Record the (timestamp, id) position a background scan has reached"""
+        self.execute(self.SET_WATERMARK, (name, last_ts, last_id))
+        return True
+
+    @_report_errors()
+    def get_initial_watermark(self, lag=5):
+        """Watermark for a scan that starts now, without rescanning history"""
+        row = self.fetch_one(self.INITIAL_WATERMARK, (lag,))
+        return (row[0], 0)
+
+    @_report_errors()
+    def get_order_changes(self, since, limit=500, lag=5):
+        """Get orders changed after the ``since`` (updated_at, id) watermark.
+
+        Rows are returned in (updated_at, id) order with the owner's
+        telegram_id and the status last announced to them (notified_status).
+        Changes newer than ``lag`` seconds are left for the next scan so rows
+        committed late with an earlier timestamp are not skipped.
+        """
+        params = (since[0], since[0], since[1], lag, limit)
+        return self.fetch_all(self.ORDER_CHANGES, params, dictionary=True)
+
+    @_report_errors(default=False)
+    def set_notified_statuses(self, statuses):
+        """Record the (order id, status) pairs the customers were just told about"""
+        if statuses:
+            self.execute_many(self.SET_NOTIFIED_STATUS, statuses)
+        return True
+
+    @_report_errors()
+    def get_order_summary(self, user_id):
+        """The user's order counters, one primary-key read; None if nothing is summarized yet.
+
+        ``month_amount`` is what the user spent in the current calendar month
+        (cancelled orders excluded), and reads 0 once the stored month is over.
+        """
+        row = self.fetch_one(ORDER_SUMMARY_BY_USER, (user_id,), dictionary=True)
+        return _summary(user_id, row, _month(datetime.now())) if row else None
+
+    @_report_errors()
+    def refresh_order_summary(self, limit=500, lag=5):
+        """Fold the next ``limit`` changed orders into user_order_summary; returns how many.
+
+        The changes, the summary rows and the advanced watermark are written
+        in one transaction under a lock on the watermark row, so a batch is
+        applied exactly once even if a rebuild runs at the same time. Each
+        order is applied as the difference from its snapshot, so seeing the
+        same state twice changes nothing.
+        """
+        with self.transaction():
+            row = self.fetch_one(self.LOCK_WATERMARK, (ORDER_SUMMARY_WATERMARK,))
+            since = tuple(row) if row else ORDER_SUMMARY_EPOCH
+            params = (since[0], since[0], since[1], lag, limit)
+            changes = self.fetch_all(self.ORDER_CHANGES, params, dictionary=True)
+            if not changes:
+                return 0
+            
+            placeholders = ', '.join(['%s'] * len(changes))
+            query = f"""
+                SELECT order_id AS id, user_id, status, total_amount, created_at
+                FROM order_summary_snapshots WHERE order_id IN ({placeholders})
+            """
+            snapshots = {snapshot['id']: snapshot for snapshot in self.fetch_all(query, [order['id'] for order in changes], dictionary=True)}
+            
+            user_ids = {order['user_id'] for order in changes} | {snapshot['user_id'] for snapshot in snapshots.values()}
+            placeholders = ', '.join(['%s'] * len(user_ids))
+            query = f"SELECT user_id, {', '.join(SUMMARY_COLUMNS)} FROM user_order_summary WHERE user_id IN ({placeholders})"
+            stored = {row['user_id']: row for row in self.fetch_all(query, list(user_ids), dictionary=True)}
+            month = _month(datetime.now())
+            summaries = {user_id: _summary(user_id, stored.get(user_id), month) for user_id in user_ids}
+            
+            for order in changes:
+                snapshot = snapshots.get(order['id'])
+                if snapshot:
+                    _fold_order(summaries[snapshot['user_id']], snapshot, -1)
+                _fold_order(summaries[order['user_id']], order, 1)
+            
+            writes = {
+                UPDATE_ORDER_SUMMARY: [_summary_params(s) for s in summaries.values() if s['user_id'] in stored],
+                INSERT_ORDER_SUMMARY: [_summary_params(s) for s in summaries.values() if s['user_id'] not in stored],
+                UPDATE_ORDER_SNAPSHOT: [_snapshot_params(o) for o in changes if o['id'] in snapshots],
+                INSERT_ORDER_SNAPSHOT: [_snapshot_params(o) for o in changes if o['id'] not in snapshots],
+            }
+            for statement, rows in writes.items():
+                if rows:
+                    self.execute_many(statement, rows)
+            last = changes[-1]
+            self.execute(self.SET_WATERMARK, (ORDER_SUMMARY_WATERMARK, last['updated_at'], last['id']))
+        return len(changes)
+
+    @_report_errors()
+    def rebuild_order_summary(self, lag=5):
+        """Recompute every user's summary from the orders table; returns the users summarized.
+
+        A repair tool: it reads the whole orders table in one transaction.
+        The incremental scan then resumes ``lag`` seconds before the rebuild,
+        re-reading the last few changes harmlessly.
+        """
+        with self.transaction():
+            self.fetch_one(self.LOCK_WATERMARK, (ORDER_SUMMARY_WATERMARK,))
+            # Taken first, so changes committed during the copy are scanned again
+            resume_at = self.fetch_one(self.INITIAL_WATERMARK, (lag,))[0]
+            self.execute("DELETE FROM user_order_summary")
+            self.execute("DELETE FROM order_summary_snapshots")
+            self.execute("""
+                INSERT INTO order_summary_snapshots (order_id, user_id, status, total_amount, created_at)
+                SELECT id, user_id, status, total_amount, created_at FROM orders
+            """)
+            
+            month = _month(datetime.now())
+            summaries = {}
+            query = "SELECT order_id AS id, user_id, status, total_amount, created_at FROM order_summary_snapshots"
+            for order in self.iter_rows(query, dictionary=True):
+                summary = summaries.get(order['user_id'])
+                if summary is None:
+                    summary = summaries[order['user_id']] = _summary(order['user_id'], month=month)
+                _fold_order(summary, order, 1)
+            
+            if summaries:
+                self.execute_many(INSERT_ORDER_SUMMARY, [_summary_params(s) for s in summaries.values()])
+            self.execute(self.SET_WATERMARK, (ORDER_SUMMARY_WATERMARK, resume_at, 0))
+        return len(summaries)
+
+    @_report_errors()
+    def create_broadcast(self, admin_telegram_id, message, locale=None):
+        """Record a new broadcast, reported to the admin in ``locale``, and return its id"""
+        query = "INSERT INTO broadcasts (admin_telegram_id, message, locale) VALUES (%s, %s, %s)"
+        return self.execute(query, (admin_telegram_id, message, locale)).lastrowid
+
+    @_report_errors()
+    def get_running_broadcasts(self):
+        """Get broadcasts that were interrupted before finishing"""
+        query = """
+            SELECT id, admin_telegram_id, message, locale, last_user_id, sent, failed
+            FROM broadcasts WHERE status = 'running' ORDER BY id
+        """
+        return self.fetch_all(query, dictionary=True)
+
+    @_report_errors()
+    def get_broadcast_recipients(self, after_user_id, limit=500):
+        """Get the next chunk of (user id, telegram_id) rows, in primary-key order.
+
+        Each chunk is a short range scan starting right after the previous
+        chunk's last id, so reading the whole table never needs more memory
+        than one chunk and can resume from a checkpointed id.
+        """
+        return self.fetch_all(BROADCAST_RECIPIENTS, (after_user_id, limit))
+
+    @_report_errors()
+    def checkpoint_broadcast(self, broadcast_id, last_user_id, sent, failed, status='running'):
+        """Save how far a broadcast has got"""
+        query = """
+            UPDATE broadcasts SET last_user_id = %s, sent = %s, failed = %s, status = %s
+            WHERE id = %s
+        """
+        self.execute(query, (last_user_id, sent, failed, status, broadcast_id))
+        return True
+
+    @_report_errors()
+    def create_password_reset_token(self, user_id):
+        """Create password reset token; any earlier live token of the user stops working"""
+        token = secrets.token_urlsafe(32)
+        expires_at = datetime.now() + timedelta(hours=1)
+        
+        query = """
+            INSERT INTO password_reset_tokens (user_id, token, expires_at)
+            VALUES (%s, %s, %s)
+        """
+        with self.transaction():
+            self.execute("UPDATE password_reset_tokens SET used = TRUE WHERE user_id = %s AND used = FALSE", (user_id,))
+            self.execute(query, (user_id, hash_reset_token(token), expires_at))
+        return token
+
+    @_report_errors()
+    def verify_reset_token(self, token):
+        """Verify password reset token (a point lookup on the unique token index)"""
+        row = self.fetch_one(self.VERIFY_RESET_TOKEN, (hash_reset_token(token),))
+        return row[0] if row else None
+
+    @_report_errors(default=False)
+    def reset_password(self, user_id, password_hash, token):
+        """Set the (already hashed) new password and consume the token, all or nothing"""
+        with self.transaction():
+            # Mark token as used; only a live, unused token for this user counts
+            if self.execute(self.CONSUME_RESET_TOKEN, (hash_reset_token(token), user_id)).rowcount != 1:
+                return False
+            
+            # Update password
+            self.execute("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, user_id))
+        return True
+
+    @_report_errors(default=0)
+    def delete_spent_reset_tokens(self, limit=500):
+        """Delete up to ``limit`` used or expired reset tokens; returns how many went"""
+        return self.execute(self.SWEEP_RESET_TOKENS, (limit,)).rowcount
+
+    @_report_errors()
+    def acquire_lease(self, name, holder, ttl):
+        """Take or renew the lease ``name`` for ``ttl`` seconds if it is ours, expired or unclaimed.
+
+        Expiry is computed on the database clock, so replicas never compare
+        their own clocks. Returns True if ``holder`` now has the lease.
+        """
+        if self.execute(self.RENEW_LEASE, (holder, ttl, name, holder)).rowcount == 1:
+            return True
+        # No row yet; if another replica inserts first, ours is ignored
+        return self.execute(self.INSERT_LEASE, (name, holder, ttl)).rowcount == 1
+
+    @_report_errors(default=False)
+    def release_lease(self, name, holder):
+        """Give up the lease so another replica can take it over right away"""
+        return self.execute("DELETE FROM bot_leases WHERE name = %s AND holder = %s", (name, holder)).rowcount == 1
+
+
+class AsyncDatabase:
+    """Awaitable front-end for a Storage backend.
+
+    Every public storage method is exposed under the same name as a coroutine
+    function that runs the blocking call on a bounded thread pool, so a slow
+    database round trip only occupies one worker instead of the event loop.
+    """
+
+    def __init__(self, database=None, max_workers=None):
+        self.database = database or create_database()
+        # Default to one worker per backend connection so no query waits twice.
+        max_workers = max_workers or int(os.getenv('DB_MAX_WORKERS', self.database.concurrency))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+
+    def __getattr__(self, name):
+        method = getattr(self.database, name)
+        if name.startswith('_') or not callable(method):
+            return method
+
+        latency = DB_SECONDS.labels(name)
+
+        def timed(submitted, args, kwargs):
+            started = time.perf_counter()
+            DB_WAIT_SECONDS.observe(started - submitted)
+            try:
+                return method(*args, **kwargs)
+            except self.database.errors:
+                DB_ERRORS.labels(name).inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started)
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            # Carry the handler's context (user id, state) into the worker's log records
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, context.run, timed, time.perf_counter(), args, kwargs)
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+    def close(self):
+        """Wait for in-flight queries and release the worker threads"""
+        self.executor.shutdown(wait=True)
+
+
+def create_database(backend=None, hasher=None):
+    """The storage backend selected by DB_BACKEND: 'mysql' (default) or 'sqlite'"""
+    backend = backend or os.getenv('DB_BACKEND', 'mysql')
+    # Imported here so a deployment only needs the driver it actually uses
+    if backend == 'mysql':
+        from database import Database
+        return Database(hasher)
+    if backend == 'sqlite':
+        from sqlite_database import SQLiteDatabase
+        return SQLiteDatabase(hasher=hasher)
+    raise ValueError(f"Unknown DB_BACKEND: {backend}")
@@ -0,0 +1,90 @@
+"""Keeps user_order_summary current, and repairs it.
+
+    python summary.py refresh    fold in every order change not summarized yet
+    python summary.py rebuild    recompute all summaries from the orders table
+"""
+import os
+import sys
+import asyncio
+import logging
+import argparse
+from periodic import run_periodically
+
+logger = logging.getLogger(__name__)
+
+class OrderSummaryRefresher:
+    """Folds changed orders into the per-user summaries in the background.
+
+    Each pass reads the orders past the 'order_summary' watermark, in
+    batches, and applies them as differences against the last state seen
+    of each order. A fresh database starts from the first order, so the
+    whole history is summarized a batch at a time without a rebuild.
+    """
+
+    def __init__(self, db, interval=None, batch_size=None, lag=None, pause=0.1):
+        self.db = db
+        self.interval = interval or float(os.getenv('ORDER_SUMMARY_INTERVAL', '30'))
+        self.batch_size = batch_size or int(os.getenv('ORDER_SUMMARY_BATCH', '500'))
+        self.lag = lag if lag is not None else int(os.getenv('ORDER_SUMMARY_LAG', '5'))
+        self.pause = pause
+        self.applied = 0
+
+    async def run(self):
+        """Refresh every ``interval`` seconds until cancelled"""
+        await run_periodically(self.refresh_once, self.interval, "Order summary refresh")
+
+    async def refresh_once(self):
+        """Apply batches until one comes back short; returns the orders applied"""
+        total = 0
+        while True:
+            applied = await self.db.refresh_order_summary(self.batch_size, self.lag)
+            if applied is None:
+                break
+            total += applied
+            if applied < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+        if total:
+            self.applied += total
+            logger.info("Folded %d order changes into the order summaries", total)
+        return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the per-user order summaries")
+    parser.add_argument('command', choices=('refresh', 'rebuild'))
+    args = parser.parse_args()
+    logging.basicConfig(format='%(levelname)s %(message)s', level=logging.INFO)
+
+    from storage import create_database
+    database = create_database()
+    if not database.connect():
+        return 1
+    try:
+        if not database.ensure_schema():
+            return 1
+        lag = int(os.getenv('ORDER_SUMMARY_LAG', '5'))
+        if args.command == 'rebuild':
+            users = database.rebuild_order_summary(lag)
+            if users is None:
+                return 1
+            print(f"Rebuilt the order summaries of {users} users")
+            return 0
+
+        batch_size = int(os.getenv('ORDER_SUMMARY_BATCH', '500'))
+        total = 0
+        while True:
+            applied = database.refresh_order_summary(batch_size, lag)
+            if applied is None:
+                return 1
+            total += applied
+            if applied < batch_size:
+                break
+        print(f"Applied {total} order changes")
+        return 0
+    finally:
+        database.disconnect()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
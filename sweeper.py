@@ -0,0 +1,39 @@
+import os
+import asyncio
+import logging
+from periodic import run_periodically
+
+logger = logging.getLogger(__name__)
+
+class ResetTokenSweeper:
+    """Deletes used and expired password-reset tokens in the background.
+
+    Rows go in small batches with a pause in between, so the sweep never
+    holds locks long enough to stall logins, and the token table stays
+    small enough that verifying a token is a cheap point lookup.
+    """
+
+    def __init__(self, db, interval=None, batch_size=None, pause=0.1):
+        self.db = db
+        self.interval = interval or float(os.getenv('RESET_TOKEN_SWEEP_INTERVAL', '600'))
+        self.batch_size = batch_size or int(os.getenv('RESET_TOKEN_SWEEP_BATCH', '500'))
+        self.pause = pause
+        self.deleted = 0
+
+    async def run(self):
+        """Sweep every ``interval`` seconds until cancelled"""
+        await run_periodically(self.sweep_once, self.interval, "Reset token sweep")
+
+    async def sweep_once(self):
+        """Delete batches until one comes back short; returns the rows removed"""
+        total = 0
+        while True:
+            deleted = await self.db.delete_spent_reset_tokens(self.batch_size)
+            total += deleted
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+        if total:
+            self.deleted += total
+            logger.info("Swept %d spent password reset tokens", total)
+        return total
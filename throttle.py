@@ -0,0 +1,141 @@
+import os
+import time
+import asyncio
+import logging
+from metrics import LOGIN_THROTTLED
+
+logger = logging.getLogger(__name__)
+
+
+class AttemptWindow:
+    """Sliding-window attempt counter for one key, plus its lockout state.
+
+    Two fixed windows approximate the sliding one: the previous window's
+    count is weighted by how much of it still overlaps the last ``window``
+    seconds. That is two integers per key instead of a timestamp per attempt.
+    """
+
+    __slots__ = ('started', 'previous', 'current', 'strikes', 'locked_until')
+
+    def __init__(self, now):
+        self.started = now
+        self.previous = 0
+        self.current = 0
+        self.strikes = 0
+        self.locked_until = 0.0
+
+    def _roll(self, now, window):
+        elapsed = now - self.started
+        if elapsed >= window:
+            # Only the window right before the current one still overlaps
+            self.previous = self.current if elapsed < 2 * window else 0
+            self.current = 0
+            self.started = now - elapsed % window
+
+    def count(self, now, window):
+        self._roll(now, window)
+        overlap = 1 - (now - self.started) / window
+        return self.previous * overlap + self.current
+
+    def idle(self, now, window):
+        """Nothing left worth remembering: no lockout and no attempts in the window"""
+        return now >= self.locked_until and now - self.started >= 2 * window
+
+
+class LoginThrottle:
+    """Limits password attempts per phone number and per Telegram account.
+
+    Callers ask ``hit`` before doing any database or bcrypt work. Every
+    attempt counts against each of the given keys, so one account trying
+    many phones and many accounts trying one phone are both caught. Once a
+    key has used ``max_attempts`` within ``window`` seconds, the next attempt
+    locks it for ``lockout`` seconds, doubling with each further lockout up
+    to ``max_lockout``. A successful login clears the keys.
+
+    Counters live in memory only; ``run_eviction`` drops idle ones
+    periodically, and the table is capped at ``maxsize`` keys. The throttle
+    is used from the event loop only, so it needs no lock.
+    """
+
+    def __init__(self, max_attempts=None, window=None, lockout=None, max_lockout=None, maxsize=100000):
+        self.max_attempts = max_attempts or int(os.getenv('LOGIN_MAX_ATTEMPTS', '5'))
+        self.window = window or float(os.getenv('LOGIN_WINDOW', '900'))
+        self.lockout = lockout or float(os.getenv('LOGIN_LOCKOUT', '300'))
+        self.max_lockout = max_lockout or float(os.getenv('LOGIN_MAX_LOCKOUT', '3600'))
+        self.maxsize = maxsize
+        self._windows = {}
+        self.rejected = 0
+        self.lockouts = 0
+
+    def retry_after(self, *keys):
+        """Seconds until every key is unlocked (0 if none is locked); counts nothing"""
+        now = time.monotonic()
+        waits = [entry.locked_until - now for entry in map(self._windows.get, keys) if entry is not None]
+        return max([0.0] + waits)
+
+    def hit(self, *keys):
+        """Record an attempt against every key.
+
+        Returns 0 if the attempt may go ahead, otherwise the seconds to
+        wait; a rejected attempt is not counted.
+        """
+        now = time.monotonic()
+        entries = []
+        for key in keys:
+            entry = self._windows.get(key)
+            if entry is None:
+                entry = self._windows[key] = AttemptWindow(now)
+            if entry.count(now, self.window) >= self.max_attempts:
+                entry.locked_until = now + min(self.lockout * 2 ** entry.strikes, self.max_lockout)
+                entry.strikes += 1
+                entry.previous = entry.current = 0
+                self.lockouts += 1
+                logger.warning("Locked login key %s for %.0fs after repeated attempts", key, entry.locked_until - now)
+            entries.append(entry)
+        if len(self._windows) > self.maxsize:
+            self.evict()
+
+        wait = self.retry_after(*keys)
+        if wait > 0:
+            self.rejected += 1
+            LOGIN_THROTTLED.inc()
+            return wait
+        for entry in entries:
+            entry.current += 1
+        return 0
+
+    def clear(self, *keys):
+        for key in keys:
+            self._windows.pop(key, None)
+
+    def evict(self):
+        """Drop idle counters; if still over ``maxsize``, drop unlocked ones oldest first"""
+        now = time.monotonic()
+        before = len(self._windows)
+        self._windows = {key: entry for key, entry in self._windows.items() if not entry.idle(now, self.window)}
+        if len(self._windows) > self.maxsize:
+            # Under a flood of fresh keys, keep the lockouts and forget the rest
+            unlocked = sorted(
+                (key for key, entry in self._windows.items() if entry.locked_until <= now),
+                key=lambda key: self._windows[key].started
+            )
+            for key in unlocked[:len(self._windows) - self.maxsize]:
+                del self._windows[key]
+        return before - len(self._windows)
+
+    async def run_eviction(self, interval=60):
+        """Evict idle counters every ``interval`` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            self.evict()
+
+    def stats(self):
+        return {
+            'keys': len(self._windows),
+            'locked': sum(1 for entry in self._windows.values() if entry.locked_until > time.monotonic()),
+            'rejected': self.rejected,
+            'lockouts': self.lockouts,
+        }
+
+    def __len__(self):
+        return len(self._windows)
@@ -0,0 +1,31 @@
+import re
+
+# Iraqi mobile numbers in local form: 07 followed by an operator digit 3-9 and 8 more digits
+PHONE_PATTERN = re.compile(r'^07[3-9]\d{8}$')
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+def is_valid_phone(phone):
+    """Whether ``phone`` is an Iraqi mobile number in the 07XXXXXXXXX form"""
+    return bool(PHONE_PATTERN.match(phone or ''))
+
+
+def normalize_contact_phone(phone_number):
+    """A shared contact's number (e.g. +9647701234567) in the local 07XXXXXXXXX form"""
+    digits = re.sub(r'\D', '', phone_number or '')
+    if digits.startswith('964'):
+        digits = '0' + digits[3:]
+    return digits
+
+
+def is_valid_email(email):
+    return bool(EMAIL_PATTERN.match(email or ''))
+
+
+def password_error(password):
+    """The message key explaining why a new password is rejected, or None"""
+    if len(password) < 8:
+        return 'password_too_short'
+    if not re.search(r'[0-9]', password) or not re.search(r'[a-zA-Z]', password):
+        return 'password_needs_mix'
+    return None
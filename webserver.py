@@ -0,0 +1,81 @@
+import hmac
+import logging
+from aiohttp import web
+from telegram import Update
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebServer:
+    """Embedded aiohttp server that runs on the bot's own event loop.
+
+    Routes must be registered before ``start()``. The webhook route only
+    validates and enqueues: the update is handed to the Application's update
+    queue and Telegram gets its 200 right away, while handlers run later on
+    the normal dispatch path.
+    """
+
+    def __init__(self, application, host='0.0.0.0', port=8080):
+        self.application = application
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.runner = None
+        self.secret_token = None
+        self.health = None
+
+    def add_webhook(self, path, secret_token=None):
+        self.secret_token = secret_token
+        self.app.router.add_post('/' + path.lstrip('/'), self._handle_webhook)
+
+    def add_metrics(self, path='metrics'):
+        """Expose Prometheus metrics for scraping"""
+        self.app.router.add_get('/' + path.lstrip('/'), self._handle_metrics)
+
+    def add_health(self, health):
+        """Expose /healthz (liveness) and /readyz (readiness); 503 when failing"""
+        self.health = health
+        self.app.router.add_get('/healthz', self._handle_healthz)
+        self.app.router.add_get('/readyz', self._handle_readyz)
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        logger.info("HTTP server listening on %s:%s", self.host, self.port)
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def _handle_webhook(self, request):
+        if self.secret_token:
+            received = request.headers.get(SECRET_HEADER, '')
+            if not hmac.compare_digest(received, self.secret_token):
+                return web.Response(status=403)
+
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except (ValueError, TypeError, KeyError):
+            return web.Response(status=400)
+        if update is None:
+            return web.Response(status=400)
+
+        self.application.update_queue.put_nowait(update)
+        return web.Response()
+
+    async def _handle_healthz(self, request):
+        return web.json_response(self.health.report(), status=200 if self.health.live() else 503)
+
+    async def _handle_readyz(self, request):
+        return web.json_response(self.health.report(), status=200 if self.health.is_ready() else 503)
+
+    async def _handle_metrics(self, request):
+        body, content_type = metrics.render()
+        return web.Response(body=body, headers={'Content-Type': content_type})